@@ -0,0 +1,63 @@
+import sys
+import time
+import threading
+import requests
+
+BASE_URL = "http://localhost:8000"
+QUESTIONS = [
+    "How does Dextora help teachers?",
+    "What exams does Dextora prepare students for?",
+    "How is Dextora different from video lecture platforms?",
+    "What is the mission of Dextora?",
+]
+
+
+def run_chat(question, results, index):
+    start = time.time()
+    try:
+        with requests.post(f"{BASE_URL}/chat", json={"message": question}, stream=True) as response:
+            for _ in response.iter_content(chunk_size=None):
+                pass
+            results[index] = (response.status_code, time.time() - start, response.headers.get("Retry-After"))
+    except Exception as e:
+        results[index] = (0, time.time() - start, str(e))
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))] if values else 0.0
+
+
+def burst(size):
+    results = [None] * size
+    threads = [
+        threading.Thread(target=run_chat, args=(QUESTIONS[i % len(QUESTIONS)], results, i))
+        for i in range(size)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    admitted = [r[1] for r in results if r[0] == 200]
+    rejected = [r for r in results if r[0] in (429, 503)]
+    fast_reject = max((r[1] for r in rejected), default=0.0)
+    print(
+        f"{size:>5} | {len(admitted):>8} | {len(rejected):>8} | "
+        f"{percentile(admitted, 0.5):>7.2f} | {percentile(admitted, 0.99):>7.2f} | {fast_reject:>10.3f}"
+    )
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [8, 32, 96, 200]
+    print("burst | admitted | rejected | p50 (s) | p99 (s) | max reject s")
+    for size in sizes:
+        burst(size)
+        time.sleep(2)
+
+    print("\nAdmission stats:")
+    print(requests.get(f"{BASE_URL}/admission/stats").json())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import os
+import sys
+import csv
+import glob
+import numpy as np
+
+# Add the current directory to sys.path to ensure we can import 'core'
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+from sentence_transformers import SentenceTransformer
+from transformers import AutoTokenizer
+from core.chunking import TokenChunker, split_sentences
+
+LLM_MODEL = "Qwen/Qwen2.5-0.5B-Instruct"
+TOP_K = 3
+
+# Compares the previous 500-word chunker with the token-aware chunker on data/.
+# The company .txt files are too small to tell them apart, so the CSV answers
+# are also laid out as one long document (one paragraph per answer). Each CSV
+# question then counts as a hit if the first sentence of its answer appears in
+# one of the top-k retrieved chunks; prompt length is the LLM-token size of
+# the retrieved context.
+
+
+def word_chunks(text, chunk_size=500, overlap=50):
+    words = text.split()
+    return [" ".join(words[i:i + chunk_size]) for i in range(0, len(words), chunk_size - overlap)]
+
+
+def load_corpus(data_dir):
+    documents = []
+    for path in glob.glob(os.path.join(data_dir, "**", "*.txt"), recursive=True):
+        with open(path, "r", encoding="utf-8") as f:
+            documents.append(f.read())
+
+    pairs = {}
+    for path in glob.glob(os.path.join(data_dir, "**", "*.csv"), recursive=True):
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                question = (row.get("Question") or "").strip()
+                answer = (row.get("Answer") or "").strip()
+                if question and answer:
+                    pairs[question] = answer
+    documents.append("\n\n".join(pairs.values()))
+    return documents, list(pairs.items())
+
+
+def evaluate(name, chunks, model, llm_tokenizer, pairs):
+    embed_tokens = [len(ids) for ids in model.tokenizer(chunks, add_special_tokens=False)["input_ids"]]
+    truncated = sum(1 for n in embed_tokens if n > model.max_seq_length - 2)
+
+    matrix = model.encode(chunks, normalize_embeddings=True)
+    queries = model.encode([q for q, _ in pairs], normalize_embeddings=True)
+    hits = 0
+    prompt_tokens = []
+    for (question, answer), query in zip(pairs, queries):
+        top = np.argsort(-(matrix @ query))[:TOP_K]
+        context = "\n\n".join(chunks[i] for i in top)
+        needle = " ".join(split_sentences(answer)[0].split())
+        hits += any(needle in " ".join(chunks[i].split()) for i in top)
+        prompt_tokens.append(len(llm_tokenizer(context)["input_ids"]))
+
+    print(
+        f"{name:<22} chunks={len(chunks):>4}  avg_embed_tokens={np.mean(embed_tokens):6.1f}  "
+        f"truncated={truncated:>3}  hit@{TOP_K}={hits / len(pairs):6.1%}  "
+        f"avg_prompt_tokens={np.mean(prompt_tokens):7.1f}"
+    )
+
+
+def main():
+    data_dir = os.path.join(current_dir, "data")
+    documents, pairs = load_corpus(data_dir)
+    print(f"Corpus: {len(documents)} documents, {len(pairs)} questions")
+
+    model = SentenceTransformer('all-MiniLM-L6-v2')
+    llm_tokenizer = AutoTokenizer.from_pretrained(LLM_MODEL)
+
+    legacy = [chunk for doc in documents for chunk in word_chunks(doc)]
+    evaluate("words 500/50", legacy, model, llm_tokenizer, pairs)
+
+    for chunk_tokens, overlap in [(254, 32), (200, 30), (128, 16)]:
+        chunker = TokenChunker(model.tokenizer, model.max_seq_length, chunk_tokens, overlap)
+        chunks = [chunk for doc in documents for chunk in chunker.chunk_text(doc)]
+        evaluate(f"tokens {chunk_tokens}/{overlap}", chunks, model, llm_tokenizer, pairs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import os
+import sys
+import json
+import time
+import tempfile
+import subprocess
+
+# Add the current directory to sys.path to ensure we can import 'core'
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+MODELS = ["llm", "embedder"]
+SOURCES = ["hub", "snapshot"]
+
+
+def rss_mb():
+    # Resident set size of this process (Linux)
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def run_child(model):
+    """
+    Child mode: load one model the way the server does and print one JSON line.
+    The first call is timed separately, since mapped weights page in on first use.
+    """
+    start = time.time()
+    import torch
+    if model == "llm":
+        from core.llm import LLMEngine
+    else:
+        from core.rag import load_embedder
+    import_s = time.time() - start
+
+    rss_before = rss_mb()
+    start = time.time()
+    if model == "llm":
+        engine = LLMEngine()
+        load_s = time.time() - start
+        load_rss = rss_mb()
+        start = time.time()
+        input_ids = engine.tokenizer(["Hello, who are you?"], return_tensors="pt").input_ids
+        with torch.inference_mode():
+            engine.model(input_ids.to(engine.model.device))
+    else:
+        embedder = load_embedder()
+        load_s = time.time() - start
+        load_rss = rss_mb()
+        start = time.time()
+        embedder.encode(["Hello, who are you?"])
+    first_call_s = time.time() - start
+
+    print(json.dumps({
+        "import_s": import_s,
+        "load_s": load_s,
+        "load_mb": load_rss - rss_before,
+        "first_call_s": first_call_s,
+        "rss_mb": rss_mb(),
+    }))
+
+
+def main():
+    models = sys.argv[1:] or MODELS
+    # Hub loads are measured with the snapshot directory pointed somewhere empty
+    empty_dir = tempfile.mkdtemp()
+    results = []
+    for model in models:
+        for source in SOURCES:
+            env = dict(os.environ)
+            if source == "hub":
+                env["MODEL_SNAPSHOT_DIR"] = empty_dir
+            proc = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--child", model],
+                env=env, capture_output=True, text=True, cwd=current_dir
+            )
+            lines = [line for line in proc.stdout.splitlines() if line.startswith("{")]
+            if proc.returncode != 0 or not lines:
+                print(f"{model} from {source} failed:\n{proc.stderr[-2000:]}")
+                continue
+            results.append((model, source, json.loads(lines[-1])))
+    os.rmdir(empty_dir)
+
+    print("\nmodel    | source   | import s | load s | load MB | first call s | RSS MB")
+    for model, source, r in results:
+        print(
+            f"{model:<8} | {source:<8} | {r['import_s']:>8.2f} | {r['load_s']:>6.2f} | {r['load_mb']:>7.0f} | "
+            f"{r['first_call_s']:>12.3f} | {r['rss_mb']:>6.0f}"
+        )
+
+
+if __name__ == "__main__":
+    if "--child" in sys.argv:
+        run_child(sys.argv[-1])
+    else:
+        main()
@@ -0,0 +1,72 @@
+import os
+import sys
+import csv
+import time
+import threading
+
+# Add the current directory to sys.path to ensure we can import 'core'
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+from core.llm import LLMEngine
+
+CONCURRENCY_LEVELS = [1, 4, 16, 32]
+MAX_NEW_TOKENS = 128
+
+
+def load_questions():
+    csv_path = os.path.join(current_dir, "data", "dextora_100_questions_clean.csv")
+    with open(csv_path, 'r', encoding='utf-8') as f:
+        return [row['Question'] for row in csv.DictReader(f) if row.get('Question')]
+
+
+def run_stream(engine, question, results, index):
+    messages = [
+        {"role": "system", "content": "You are Dextora, a helpful AI mentor. Keep answers concise."},
+        {"role": "user", "content": question}
+    ]
+    start = time.time()
+    ttft = None
+    text = ""
+    for chunk in engine.stream_chat(messages, max_new_tokens=MAX_NEW_TOKENS):
+        if ttft is None:
+            ttft = time.time() - start
+        text += chunk
+    results[index] = (ttft or 0.0, len(engine.tokenizer(text).input_ids))
+
+
+def run_level(engine, questions, concurrency):
+    results = [None] * concurrency
+    threads = [
+        threading.Thread(target=run_stream, args=(engine, questions[i % len(questions)], results, i))
+        for i in range(concurrency)
+    ]
+    start = time.time()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.time() - start
+
+    ttfts = sorted(r[0] for r in results)
+    tokens = sum(r[1] for r in results)
+    p50 = ttfts[len(ttfts) // 2]
+    p95 = ttfts[min(len(ttfts) - 1, int(len(ttfts) * 0.95))]
+    print(f"{concurrency:>4} | {tokens / elapsed:>10.1f} | {p50:>8.2f} | {p95:>8.2f} | {elapsed:>7.2f}")
+
+
+def main():
+    engine = LLMEngine()
+    questions = load_questions()
+
+    # Warm up kernels and allocator before measuring
+    print("Warming up...")
+    run_level(engine, questions, 1)
+
+    print("\nconc | agg tok/s  | TTFT p50 | TTFT p95 | wall s")
+    for level in CONCURRENCY_LEVELS:
+        run_level(engine, questions, level)
+
+
+if __name__ == "__main__":
+    main()
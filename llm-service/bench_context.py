@@ -0,0 +1,81 @@
+import os
+import sys
+import csv
+import time
+
+# Add the current directory to sys.path to ensure we can import 'core'
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+from core.llm import LLMEngine
+from core.rag import RAGEngine
+from core.context import ContextPacker
+from main import SYSTEM_RULES
+
+MAX_QUESTIONS = 40
+
+
+def load_questions():
+    csv_path = os.path.join(current_dir, "data", "dextora_100_questions_clean.csv")
+    with open(csv_path, 'r', encoding='utf-8') as f:
+        rows = [row for row in csv.DictReader(f) if row.get('Question')]
+    return [row['Question'] for row in rows[:MAX_QUESTIONS]]
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+
+def time_to_first_token(llm, context_text, question):
+    messages = [
+        {"role": "system", "content": SYSTEM_RULES + context_text},
+        {"role": "user", "content": question}
+    ]
+    prompt_tokens = llm._encode(messages).shape[-1]
+    t0 = time.time()
+    for _ in llm.stream_chat(messages, temperature=0, max_new_tokens=8):
+        # Closing the generator after the first chunk cancels the request
+        break
+    return time.time() - t0, prompt_tokens
+
+
+def report(name, ttfts, prompt_tokens):
+    print(
+        f"{name:<28} TTFT p50={percentile(ttfts, 0.5) * 1000:7.1f}ms  p90={percentile(ttfts, 0.9) * 1000:7.1f}ms  "
+        f"p99={percentile(ttfts, 0.99) * 1000:7.1f}ms  prompt_tokens avg={sum(prompt_tokens) / len(prompt_tokens):6.1f} "
+        f"max={max(prompt_tokens)}"
+    )
+
+
+def main():
+    rag = RAGEngine()
+    if rag.collection.count() == 0:
+        rag.ingest_data()
+    llm = LLMEngine()
+    llm.warm_prefix(SYSTEM_RULES)
+    packer = ContextPacker(llm.tokenizer)
+    questions = load_questions()
+
+    # Before: top-1 hit joined as-is
+    ttfts, tokens = [], []
+    for question in questions:
+        hits = rag.retrieve_with_scores(question, n_results=1)
+        ttft, n = time_to_first_token(llm, "\n\n".join(hit["document"] for hit in hits), question)
+        ttfts.append(ttft)
+        tokens.append(n)
+    report("top-1, unbounded", ttfts, tokens)
+
+    # After: top-k packed into the token budget
+    ttfts, tokens = [], []
+    for question in questions:
+        hits = rag.retrieve_with_scores(question, n_results=packer.top_k)
+        context_text, _ = packer.pack(hits)
+        ttft, n = time_to_first_token(llm, context_text, question)
+        ttfts.append(ttft)
+        tokens.append(n)
+    report(f"top-{packer.top_k}, budget {packer.token_budget}", ttfts, tokens)
+
+
+if __name__ == "__main__":
+    main()
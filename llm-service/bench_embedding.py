@@ -0,0 +1,65 @@
+import os
+import sys
+import time
+import threading
+
+# Add the current directory to sys.path to ensure we can import 'core'
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+from sentence_transformers import SentenceTransformer
+from core.embedding import BatchingEmbedder
+
+CONCURRENCY_LEVELS = [1, 4, 16, 64]
+QUERIES_PER_THREAD = 20
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+
+def run_level(encode, concurrency, tag):
+    latencies = []
+    lock = threading.Lock()
+
+    def worker(worker_id):
+        for i in range(QUERIES_PER_THREAD):
+            # Unique text so the exact-match LRU does not hide model cost
+            query = f"How does Dextora help student {worker_id} with topic {i} ({tag})?"
+            t0 = time.time()
+            encode(query)
+            with lock:
+                latencies.append(time.time() - t0)
+
+    threads = [threading.Thread(target=worker, args=(w,)) for w in range(concurrency)]
+    start = time.time()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.time() - start
+    return len(latencies) / elapsed, percentile(latencies, 0.99) * 1000
+
+
+def main():
+    model = SentenceTransformer('all-MiniLM-L6-v2')
+    batcher = BatchingEmbedder(model)
+
+    def per_call(query):
+        return model.encode([query])[0]
+
+    per_call("warm up")
+    batcher.encode("warm up")
+
+    print("conc | per-call q/s | per-call p99 ms | batched q/s | batched p99 ms")
+    for level in CONCURRENCY_LEVELS:
+        naive_qps, naive_p99 = run_level(per_call, level, "naive")
+        batched_qps, batched_p99 = run_level(batcher.encode, level, "batched")
+        print(f"{level:>4} | {naive_qps:>12.1f} | {naive_p99:>15.1f} | {batched_qps:>11.1f} | {batched_p99:>14.1f}")
+
+    print(f"\nBatcher stats: {batcher.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import os
+import sys
+import csv
+import json
+import time
+import subprocess
+
+# Add the current directory to sys.path to ensure we can import 'core'
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+PROFILES = ["fp32", "bf16", "int8"]
+MAX_QUESTIONS = 20
+MAX_NEW_TOKENS = 96
+
+
+def rss_mb():
+    # Resident set size of this process (Linux)
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def load_pairs():
+    csv_path = os.path.join(current_dir, "data", "dextora_100_questions_clean.csv")
+    with open(csv_path, 'r', encoding='utf-8') as f:
+        rows = [row for row in csv.DictReader(f) if row.get('Question') and row.get('Answer')]
+    return rows[:MAX_QUESTIONS]
+
+
+def run_profile():
+    """
+    Child mode: load the engine with the LLM_PROFILE from the environment,
+    greedy-generate answers and print one JSON line of measurements.
+    """
+    from core.llm import LLMEngine
+    from main import SYSTEM_RULES
+
+    rss_before = rss_mb()
+    start = time.time()
+    engine = LLMEngine()
+    load_time = time.time() - start
+    model_mb = rss_mb() - rss_before
+
+    outputs, ttfts = [], []
+    tokens = 0
+    gen_start = time.time()
+    for row in load_pairs():
+        messages = [
+            {"role": "system", "content": SYSTEM_RULES + f"Q: {row['Question']}\nA: {row['Answer']}"},
+            {"role": "user", "content": row['Question']}
+        ]
+        t0 = time.time()
+        text = ""
+        for chunk in engine.stream_chat(messages, temperature=0, max_new_tokens=MAX_NEW_TOKENS):
+            if not text:
+                ttfts.append(time.time() - t0)
+            text += chunk
+        outputs.append(text)
+        tokens += len(engine.tokenizer(text).input_ids)
+
+    ttfts.sort()
+    print(json.dumps({
+        "load_s": load_time,
+        "model_mb": model_mb,
+        "rss_mb": rss_mb(),
+        "ttft_p50": ttfts[len(ttfts) // 2] if ttfts else 0.0,
+        "tok_s": tokens / (time.time() - gen_start),
+        "outputs": outputs,
+    }))
+
+
+def token_agreement(a, b):
+    # Fraction of the baseline answer reproduced before the first divergence
+    n = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        n += 1
+    return n / max(len(a), 1)
+
+
+def main():
+    results = {}
+    for profile in PROFILES:
+        print(f"Running profile {profile}...")
+        env = dict(os.environ, LLM_PROFILE=profile)
+        proc = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child"],
+            env=env, capture_output=True, text=True, cwd=current_dir
+        )
+        lines = [line for line in proc.stdout.splitlines() if line.startswith("{")]
+        if proc.returncode != 0 or not lines:
+            print(f"Profile {profile} failed:\n{proc.stderr[-2000:]}")
+            continue
+        results[profile] = json.loads(lines[-1])
+
+    baseline = results.get("fp32")
+    print("\nprofile | load s | model MB | RSS MB | TTFT p50 | tok/s  | exact | char agree")
+    for profile, r in results.items():
+        exact, agree = "-", "-"
+        if baseline:
+            pairs = list(zip(baseline["outputs"], r["outputs"]))
+            exact = f"{sum(a == b for a, b in pairs)}/{len(pairs)}"
+            agree = f"{sum(token_agreement(a, b) for a, b in pairs) / max(len(pairs), 1):.0%}"
+        print(
+            f"{profile:>7} | {r['load_s']:>6.1f} | {r['model_mb']:>8.0f} | {r['rss_mb']:>6.0f} | "
+            f"{r['ttft_p50']:>8.3f} | {r['tok_s']:>6.1f} | {exact:>5} | {agree:>10}"
+        )
+
+
+if __name__ == "__main__":
+    if "--child" in sys.argv:
+        run_profile()
+    else:
+        main()
@@ -0,0 +1,78 @@
+import os
+import sys
+import csv
+import time
+import tempfile
+
+# Add the current directory to sys.path to ensure we can import 'core'
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+from core.rag import RAGEngine
+from core.lexical import BM25Index
+
+TOP_K = 5
+
+
+def load_questions():
+    csv_path = os.path.join(current_dir, "data", "dextora_100_questions_clean.csv")
+    with open(csv_path, 'r', encoding='utf-8') as f:
+        return [row['Question'].strip() for row in csv.DictReader(f) if row.get('Question')]
+
+
+def percentile_ms(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))] * 1000
+
+
+def main():
+    rag = RAGEngine()
+    if rag.collection.count() == 0:
+        rag.ingest_data()
+    if rag.lexical is None:
+        rag.lexical = BM25Index(os.path.join(tempfile.mkdtemp(), "bm25_index"))
+        rag.refresh_lexical()
+    questions = load_questions()
+
+    def embed(question):
+        # Straight to the model: the query LRU would hide the encode on repeats
+        return rag.embedder.encode([question])[0]
+
+    def vector(question):
+        return rag._vector_search(embed(question), TOP_K)
+
+    def lexical(question):
+        return rag.lexical.query(question, TOP_K)
+
+    def hybrid(question):
+        candidates = max(TOP_K * 4, 10)
+        return rag._fuse(rag._vector_search(embed(question), candidates), rag.lexical.query(question, candidates), TOP_K)
+
+    def routed(question):
+        return rag.lexical_lookup(question, TOP_K) or vector(question)
+
+    baseline = {}
+    print(f"{len(questions)} questions, {len(rag.lexical)} documents")
+    for name, search in [("vector", vector), ("bm25", lexical), ("hybrid", hybrid), ("bm25 fast path", routed)]:
+        timings = []
+        agree = correct = 0
+        for question in questions:
+            t0 = time.perf_counter()
+            hits = search(question)
+            timings.append(time.perf_counter() - t0)
+            top = hits[0]["document"] if hits else None
+            if name == "vector":
+                baseline[question] = top
+            agree += top == baseline[question]
+            correct += bool(top) and top.startswith(f"Q: {question}\n")
+        fast = ""
+        if name == "bm25 fast path":
+            fast = f"  lexical_answers={sum(1 for q in questions if rag.lexical_lookup(q))}"
+        print(
+            f"{name:<16} p50={percentile_ms(timings, 0.5):8.3f}ms  p99={percentile_ms(timings, 0.99):8.3f}ms  "
+            f"top1_agreement={agree / len(questions):6.1%}  own_pair_top1={correct / len(questions):6.1%}{fast}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import os
+import sys
+import csv
+import time
+
+# Add the current directory to sys.path to ensure we can import 'core'
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+from core.llm import LLMEngine
+from main import SYSTEM_RULES
+
+MAX_QUESTIONS = 30
+MAX_NEW_TOKENS = 128
+NUM_DRAFT_TOKENS = int(os.getenv("LLM_SPEC_NUM_TOKENS", "10"))
+
+
+def load_pairs():
+    csv_path = os.path.join(current_dir, "data", "dextora_100_questions_clean.csv")
+    with open(csv_path, 'r', encoding='utf-8') as f:
+        rows = [row for row in csv.DictReader(f) if row.get('Question') and row.get('Answer')]
+    return rows[:MAX_QUESTIONS]
+
+
+def run(engine, pairs):
+    """
+    Greedy-generate an answer for every question, with the CSV answer as the
+    retrieved context. Returns (outputs, tokens/s).
+    """
+    outputs = []
+    tokens = 0
+    start = time.time()
+    for row in pairs:
+        messages = [
+            {"role": "system", "content": SYSTEM_RULES + f"Q: {row['Question']}\nA: {row['Answer']}"},
+            {"role": "user", "content": row['Question']}
+        ]
+        text = "".join(engine.stream_chat(messages, temperature=0, max_new_tokens=MAX_NEW_TOKENS))
+        outputs.append(text)
+        tokens += len(engine.tokenizer(text).input_ids)
+    return outputs, tokens / (time.time() - start)
+
+
+def main():
+    engine = LLMEngine()
+    scheduler = engine.scheduler
+    pairs = load_pairs()
+    print(f"Benchmarking {len(pairs)} questions, greedy, max_new_tokens={MAX_NEW_TOKENS}")
+
+    scheduler.speculative_tokens = 0
+    run(engine, pairs[:2])  # warm-up
+    baseline, baseline_tps = run(engine, pairs)
+
+    scheduler.speculative_tokens = NUM_DRAFT_TOKENS
+    drafted, accepted = scheduler.draft_tokens, scheduler.accepted_draft_tokens
+    speculative, speculative_tps = run(engine, pairs)
+    drafted = scheduler.draft_tokens - drafted
+    accepted = scheduler.accepted_draft_tokens - accepted
+
+    identical = sum(a == b for a, b in zip(baseline, speculative))
+    print(f"Baseline:    {baseline_tps:.1f} tok/s")
+    print(f"Speculative: {speculative_tps:.1f} tok/s ({speculative_tps / baseline_tps:.2f}x)")
+    print(f"Draft acceptance: {accepted}/{drafted} ({accepted / max(drafted, 1):.0%})")
+    print(f"Identical outputs: {identical}/{len(pairs)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import os
+import sys
+import json
+import time
+import requests
+
+# Add the current directory to sys.path to ensure we can import 'core'
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+from core.speech import SentenceBuffer
+
+BASE_URL = os.getenv("BENCH_BASE_URL", "http://localhost:8000")
+QUESTIONS = [
+    "How does Dextora help teachers?",
+    "What exams does Dextora prepare students for?",
+    "How is Dextora different from video lecture platforms?",
+    "How does Dextora personalize study plans?",
+]
+
+# Time-to-first-audio against a running server, end to end as the avatar sees it.
+# For comparable numbers start the server with RESPONSE_CACHE_SIZE=0,
+# TTS_CACHE_MAX_MB=0 and TTS_CACHE_MEMORY_MB=0, otherwise the second flow is
+# answered from the caches the first one filled.
+
+
+def browser_flow(question):
+    """
+    Current frontend: stream /chat, split sentences client-side, then POST the
+    first sentence to /tts and wait for the whole MP3.
+    """
+    start = time.time()
+    splitter = SentenceBuffer()
+    first_sentence = None
+    with requests.post(f"{BASE_URL}/chat", json={"message": question}, stream=True) as response:
+        for chunk in response.iter_content(chunk_size=None, decode_unicode=True):
+            sentences = splitter.feed(chunk)
+            if sentences:
+                first_sentence = sentences[0]
+                break
+    first_sentence = first_sentence or (splitter.flush() or [""])[0]
+    audio = requests.post(f"{BASE_URL}/tts", json={"message": first_sentence})
+    audio.raise_for_status()
+    return time.time() - start
+
+
+def speech_flow(question):
+    """
+    /chat/speech: time until the first audio segment arrives on the stream.
+    """
+    start = time.time()
+    first_audio = None
+    with requests.post(f"{BASE_URL}/chat/speech", json={"message": question}, stream=True) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            event = json.loads(line)
+            if event["type"] == "audio" and first_audio is None:
+                first_audio = time.time() - start
+    return first_audio
+
+
+def main():
+    for name, flow in [("/chat + /tts", browser_flow), ("/chat/speech", speech_flow)]:
+        timings = []
+        for question in QUESTIONS:
+            ttfa = flow(question)
+            if ttfa is not None:
+                timings.append(ttfa)
+        timings.sort()
+        if not timings:
+            print(f"{name:<14} no audio received")
+            continue
+        print(
+            f"{name:<14} time-to-first-audio median={timings[len(timings) // 2] * 1000:7.0f}ms  "
+            f"max={timings[-1] * 1000:7.0f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
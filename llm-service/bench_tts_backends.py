@@ -0,0 +1,56 @@
+import os
+import sys
+import time
+import asyncio
+
+# Add the current directory to sys.path to ensure we can import 'core'
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+from core.tts_registry import TTSRegistry
+
+SENTENCES = [
+    "Hello, I am Dextora.",
+    "Dextora is an AI mentorship platform for students from Class 1 to 12.",
+    "It helps students prepare for competitive exams like IIT-JEE and NEET with personalized study plans.",
+]
+ROUNDS = 3
+
+
+async def synthesize(engine, text):
+    start = time.time()
+    size = 0
+    async for chunk in engine.stream_async(text):
+        size += len(chunk)
+    return time.time() - start, size
+
+
+async def bench(name):
+    # Second construction shows the warm start (LuxTTS reloads its encoded prompt)
+    cold = TTSRegistry(name)
+    cold.get()
+    warm = TTSRegistry(name)
+    engine = warm.get()
+    print(f"{name:<8} startup first={cold.startup_seconds[name]:.2f}s second={warm.startup_seconds[name]:.2f}s")
+
+    await synthesize(engine, "ok")
+    for text in SENTENCES:
+        timings = []
+        for _ in range(ROUNDS):
+            elapsed, size = await synthesize(engine, text)
+            timings.append(elapsed)
+        timings.sort()
+        print(f"{'':<8} {len(text):>4} chars: median {timings[len(timings) // 2] * 1000:7.0f}ms ({size} bytes {engine.media_type})")
+
+
+def main():
+    names = sys.argv[1:] or TTSRegistry().names()
+    for name in names:
+        try:
+            asyncio.run(bench(name))
+        except Exception as e:
+            print(f"{name:<8} unavailable: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import os
+import sys
+import time
+import asyncio
+
+# Add the current directory to sys.path to ensure we can import 'core'
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+from core.audio_encoding import AudioEncoder
+
+ANSWER = (
+    "Dextora AI is an advanced AI mentorship platform designed for students from Class 1 to 12. "
+    "It helps students prepare for competitive exams like IIT-JEE and NEET. "
+    "Dextora provides personalized guidance, research-backed study methods, and 24/7 adaptive support. "
+    "The platform uses smart contextual cues to monitor posture and engagement. "
+    "Our mission is to democratize high-quality education and mentorship."
+)
+FORMATS = ["wav", "mp3", "opus"]
+
+
+async def run(engine, fmt):
+    """
+    Stream ANSWER in `fmt`; returns (bytes, time to first audio, total time).
+    """
+    engine.audio_format = fmt
+    engine.encoder = None if fmt == "wav" else AudioEncoder(fmt)
+    start = time.time()
+    first = None
+    size = 0
+    async for chunk in engine.stream_async(ANSWER):
+        if first is None:
+            first = time.time() - start
+        size += len(chunk)
+    return size, first, time.time() - start
+
+
+async def main():
+    # Import here so the module's torch/zipvoice imports are only paid when benchmarking
+    from core.zipvoice_service import LuxTTSEngine
+    engine = LuxTTSEngine()
+
+    # Audio duration for the real-time factor
+    wave = await engine.synthesize_pcm(ANSWER)
+    duration = len(wave) / engine.SAMPLE_RATE
+    print(f"Answer: {len(ANSWER)} chars, {duration:.1f}s of audio")
+    print(f"Output: {os.getenv('TTS_AUDIO_BITRATE', '48k')} at {os.getenv('TTS_AUDIO_SAMPLE_RATE', '24000')} Hz")
+
+    for fmt in FORMATS:
+        size, first, total = await run(engine, fmt)
+        print(
+            f"{fmt:<5} bytes={size:>9}  time_to_first_audio={first * 1000:7.0f}ms  "
+            f"total={total * 1000:7.0f}ms  rtf={total / duration:5.2f}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
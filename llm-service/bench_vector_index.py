@@ -0,0 +1,87 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+import numpy as np
+import chromadb
+
+# Add the current directory to sys.path to ensure we can import 'core'
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+from core.vector_index import NumpyIndex
+
+DIM = 384  # all-MiniLM-L6-v2
+QUERIES = 200
+TOP_K = 3
+
+
+def percentile_ms(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))] * 1000
+
+
+def time_queries(fn, queries):
+    timings = []
+    for q in queries:
+        t0 = time.perf_counter()
+        fn(q)
+        timings.append(time.perf_counter() - t0)
+    return percentile_ms(timings, 0.5), percentile_ms(timings, 0.99)
+
+
+def bench_size(size, rng):
+    vectors = rng.standard_normal((size, DIM), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    documents = [f"chunk {i}" for i in range(size)]
+    metadatas = [{"source": "synthetic"} for _ in range(size)]
+    queries = [vectors[i] + 0.05 * rng.standard_normal(DIM, dtype=np.float32) for i in rng.integers(0, size, QUERIES)]
+
+    workdir = tempfile.mkdtemp(prefix="bench_index_")
+    try:
+        client = chromadb.PersistentClient(path=os.path.join(workdir, "chroma"))
+        collection = client.get_or_create_collection(name="bench")
+        batch = client.get_max_batch_size()
+        t0 = time.time()
+        for start in range(0, size, batch):
+            end = start + batch
+            collection.add(
+                ids=[str(i) for i in range(start, min(end, size))],
+                embeddings=vectors[start:end].tolist(),
+                documents=documents[start:end],
+                metadatas=metadatas[start:end]
+            )
+        chroma_build = time.time() - t0
+
+        def chroma_query(q):
+            collection.query(query_embeddings=[q.tolist()], n_results=TOP_K)
+
+        rows = [("chroma", chroma_build, 0.0) + time_queries(chroma_query, queries)]
+        for dtype in NumpyIndex.DTYPES:
+            snapshot = os.path.join(workdir, f"numpy_{dtype}")
+            index = NumpyIndex(snapshot, dtype=dtype)
+            t0 = time.time()
+            index.build(vectors, documents, metadatas)
+            build = time.time() - t0
+            t0 = time.time()
+            NumpyIndex(snapshot, dtype=dtype).load()
+            reload = time.time() - t0
+            rows.append((f"numpy-{dtype}", build, reload) + time_queries(lambda q: index.query(q, TOP_K), queries))
+
+        for name, build, reload, p50, p99 in rows:
+            print(f"{size:>9} | {name:>13} | {build:>8.2f} | {reload * 1000:>9.1f} | {p50:>8.3f} | {p99:>8.3f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1_000, 100_000, 1_000_000]
+    rng = np.random.default_rng(0)
+    print("  vectors |       backend |  build s | reload ms |  p50 ms  |  p99 ms")
+    for size in sizes:
+        bench_size(size, rng)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import os
+import sys
+import csv
+import time
+import signal
+import threading
+import subprocess
+import requests
+
+# Add the current directory to sys.path to ensure we can import 'core'
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+WORKER_COUNTS = [1, 2, 4, 8]
+CONCURRENCY = int(os.getenv("BENCH_CONCURRENCY", "32"))
+DURATION = float(os.getenv("BENCH_DURATION", "30"))
+PORT = int(os.getenv("BENCH_PORT", "8765"))
+BASE_URL = f"http://127.0.0.1:{PORT}"
+
+
+def load_questions():
+    csv_path = os.path.join(current_dir, "data", "dextora_100_questions_clean.csv")
+    with open(csv_path, 'r', encoding='utf-8') as f:
+        return [row['Question'] for row in csv.DictReader(f) if row.get('Question')]
+
+
+def process_tree(root):
+    pids = [root]
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    # Field 4 is the parent pid (after the parenthesized command name)
+                    if int(f.read().rsplit(")", 1)[1].split()[1]) == root:
+                        pids.append(int(entry))
+            except (OSError, IndexError, ValueError):
+                pass
+    return pids
+
+
+def memory_mb(root):
+    """
+    (RSS, PSS) summed over the server and its workers. RSS counts shared
+    pages once per process; PSS splits them, so it is the real total.
+    """
+    rss = pss = 0
+    for pid in process_tree(root):
+        try:
+            with open(f"/proc/{pid}/smaps_rollup") as f:
+                for line in f:
+                    if line.startswith("Rss:"):
+                        rss += int(line.split()[1])
+                    elif line.startswith("Pss:"):
+                        pss += int(line.split()[1])
+        except OSError:
+            pass
+    return rss / 1024, pss / 1024
+
+
+def start_server(workers):
+    env = dict(
+        os.environ,
+        HOST="127.0.0.1",
+        PORT=str(PORT),
+        WEB_WORKERS=str(workers),
+        # Every request goes through the LLM: no cached or curated answers
+        RESPONSE_CACHE_THRESHOLD="1.01",
+        QA_DIRECT_MAX_DISTANCE="-1",
+    )
+    start = time.time()
+    proc = subprocess.Popen(
+        [sys.executable, "main.py"], cwd=current_dir, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    # /ready answers from whichever worker takes the connection: wait for a run of 200s
+    ready_in_a_row = 0
+    while ready_in_a_row < workers * 3:
+        if proc.poll() is not None:
+            raise RuntimeError(f"Server exited with status {proc.returncode}")
+        if time.time() - start > 600:
+            raise RuntimeError("Server not ready after 600s")
+        try:
+            ok = requests.get(f"{BASE_URL}/ready", timeout=5).status_code == 200
+        except requests.RequestException:
+            ok = False
+        ready_in_a_row = ready_in_a_row + 1 if ok else 0
+        time.sleep(0.05 if ok else 0.5)
+    return proc, time.time() - start
+
+
+def stop_server(proc):
+    proc.send_signal(signal.SIGTERM)
+    try:
+        proc.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+
+def client(questions, offset, deadline, results):
+    i = offset
+    while time.time() < deadline:
+        start = time.time()
+        ttft = None
+        chars = 0
+        try:
+            with requests.post(f"{BASE_URL}/chat", json={"message": questions[i % len(questions)]}, stream=True, timeout=120) as response:
+                if response.status_code != 200:
+                    results.append(("error", 0.0, 0))
+                    time.sleep(0.1)
+                    continue
+                for chunk in response.iter_content(chunk_size=None, decode_unicode=True):
+                    if chunk and ttft is None:
+                        ttft = time.time() - start
+                    chars += len(chunk)
+        except requests.RequestException:
+            results.append(("error", 0.0, 0))
+            continue
+        results.append(("ok", ttft or 0.0, chars))
+        i += CONCURRENCY
+
+
+def run_load(questions):
+    results = []
+    deadline = time.time() + DURATION
+    threads = [
+        threading.Thread(target=client, args=(questions, i, deadline, results))
+        for i in range(CONCURRENCY)
+    ]
+    start = time.time()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results, time.time() - start
+
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or WORKER_COUNTS
+    questions = load_questions()
+    print(f"{CONCURRENCY} concurrent clients for {DURATION:.0f}s per worker count, {os.cpu_count()} cores")
+    print("\nworkers | ready s | req/s | chars/s | TTFT p50 | TTFT p95 | errors | RSS MB | PSS MB")
+    for workers in counts:
+        proc, ready_s = start_server(workers)
+        try:
+            results, elapsed = run_load(questions)
+            rss, pss = memory_mb(proc.pid)
+        finally:
+            stop_server(proc)
+        done = [r for r in results if r[0] == "ok"]
+        ttfts = sorted(r[1] for r in done) or [0.0]
+        print(
+            f"{workers:>7} | {ready_s:>7.1f} | {len(done) / elapsed:>5.2f} | {sum(r[2] for r in done) / elapsed:>7.0f} | "
+            f"{ttfts[len(ttfts) // 2]:>8.2f} | {ttfts[min(len(ttfts) - 1, int(len(ttfts) * 0.95))]:>8.2f} | "
+            f"{len(results) - len(done):>6} | {rss:>6.0f} | {pss:>6.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+import os
+import time
+import asyncio
+from collections import deque
+
+
+class AdmissionRejected(Exception):
+    """
+    Raised when a request cannot be admitted. Carries the HTTP status and
+    the Retry-After hint (seconds) for the response.
+    """
+
+    def __init__(self, engine, status_code, retry_after, reason):
+        super().__init__(f"{engine}: {reason}")
+        self.engine = engine
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class Ticket:
+    """
+    One admitted request. release() is idempotent so it can be called from
+    both a stream's cleanup and a response background task.
+    """
+
+    def __init__(self, controller):
+        self._controller = controller
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._controller._release()
+
+
+class AdmissionController:
+    """
+    Limits concurrent work on one engine.
+
+    Up to `max_in_flight` requests run at once; up to `max_queue` more wait
+    in FIFO order for at most `timeout` seconds. A full queue is rejected
+    with 429 and an expired wait with 503, both with Retry-After, so an
+    overload turns into fast rejections instead of everyone getting slow.
+    Must be used from the event loop thread.
+    """
+
+    def __init__(self, name, max_in_flight, max_queue, timeout, retry_after=1):
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._in_flight = 0
+        self._waiters = deque()
+        self._waits = deque(maxlen=1000)
+        self.admitted = 0
+        self.rejected_full = 0
+        self.rejected_timeout = 0
+
+    @classmethod
+    def from_env(cls, name, max_in_flight, max_queue, timeout):
+        """
+        Build a controller whose limits can be overridden by <NAME>_MAX_IN_FLIGHT,
+        <NAME>_MAX_QUEUE and <NAME>_QUEUE_TIMEOUT.
+        """
+        prefix = name.upper()
+        return cls(
+            name,
+            max_in_flight=int(os.getenv(f"{prefix}_MAX_IN_FLIGHT", str(max_in_flight))),
+            max_queue=int(os.getenv(f"{prefix}_MAX_QUEUE", str(max_queue))),
+            timeout=float(os.getenv(f"{prefix}_QUEUE_TIMEOUT", str(timeout))),
+        )
+
+    async def acquire(self):
+        """
+        Wait for a slot and return a Ticket, or raise AdmissionRejected.
+        """
+        if self._in_flight < self.max_in_flight and not self._waiters:
+            self._in_flight += 1
+            return self._admit(0.0)
+
+        if len(self._waiters) >= self.max_queue:
+            self.rejected_full += 1
+            raise AdmissionRejected(self.name, 429, self.retry_after, "queue full")
+
+        start = time.monotonic()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.timeout)
+        except asyncio.TimeoutError:
+            # wait_for can time out after the slot was already handed to us
+            # (Python >= 3.12): take it rather than leak it
+            if waiter.done() and not waiter.cancelled():
+                return self._admit(time.monotonic() - start)
+            self.rejected_timeout += 1
+            raise AdmissionRejected(self.name, 503, self.retry_after, "queue wait timed out")
+        except BaseException:
+            # Cancelled while a slot was being handed to us: give it back
+            if waiter.done() and not waiter.cancelled():
+                self._release()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+        return self._admit(time.monotonic() - start)
+
+    def _admit(self, waited):
+        self.admitted += 1
+        self._waits.append(waited)
+        return Ticket(self)
+
+    def _release(self):
+        # Hand the slot straight to the next live waiter, otherwise free it
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._in_flight -= 1
+
+    def stats(self):
+        waits = sorted(self._waits)
+        p99 = waits[min(len(waits) - 1, int(len(waits) * 0.99))] if waits else 0.0
+        return {
+            "in_flight": self._in_flight,
+            "max_in_flight": self.max_in_flight,
+            "queue_depth": len(self._waiters),
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected_queue_full": self.rejected_full,
+            "rejected_timeout": self.rejected_timeout,
+            "avg_wait_seconds": round(sum(waits) / len(waits), 4) if waits else 0.0,
+            "p99_wait_seconds": round(p99, 4),
+        }
@@ -0,0 +1,83 @@
+import os
+import asyncio
+
+# format -> (ffmpeg encoder, ffmpeg container, media type)
+FORMATS = {
+    "mp3": ("libmp3lame", "mp3", "audio/mpeg"),
+    "opus": ("libopus", "ogg", "audio/ogg"),
+}
+OPUS_SAMPLE_RATES = (8000, 12000, 16000, 24000, 48000)
+
+
+class AudioEncoder:
+    """
+    Incremental compressed audio encoding through an ffmpeg subprocess (ffmpeg
+    is already installed in the service image).
+
+    encode() takes float32 mono PCM chunks and yields encoded bytes as soon as
+    ffmpeg emits them, so the first audio leaves before the last sentence is
+    synthesized. Format, bitrate and output sample rate come from
+    TTS_AUDIO_FORMAT (mp3 | opus), TTS_AUDIO_BITRATE and TTS_AUDIO_SAMPLE_RATE.
+    """
+
+    def __init__(self, fmt=None, bitrate=None, sample_rate=None):
+        self.format = (fmt or os.getenv("TTS_AUDIO_FORMAT", "mp3")).lower()
+        if self.format not in FORMATS:
+            raise ValueError(f"Unknown TTS_AUDIO_FORMAT '{self.format}', expected one of {sorted(FORMATS)}")
+        self.bitrate = bitrate or os.getenv("TTS_AUDIO_BITRATE", "48k")
+        self.sample_rate = int(sample_rate or os.getenv("TTS_AUDIO_SAMPLE_RATE", "24000"))
+        if self.format == "opus" and self.sample_rate not in OPUS_SAMPLE_RATES:
+            raise ValueError(f"Opus needs a sample rate in {OPUS_SAMPLE_RATES}, got {self.sample_rate}")
+        self.ffmpeg = os.getenv("TTS_FFMPEG", "ffmpeg")
+
+    @property
+    def media_type(self):
+        return FORMATS[self.format][2]
+
+    def _command(self, input_rate):
+        encoder, container, _ = FORMATS[self.format]
+        return [
+            self.ffmpeg, "-hide_banner", "-loglevel", "error",
+            "-f", "f32le", "-ar", str(input_rate), "-ac", "1", "-i", "pipe:0",
+            "-c:a", encoder, "-b:a", str(self.bitrate), "-ar", str(self.sample_rate),
+            # Write pages/frames out immediately instead of buffering the stream
+            "-flush_packets", "1", "-f", container, "pipe:1",
+        ]
+
+    async def encode(self, pcm_chunks, input_rate):
+        """
+        Encode an async iterator of float32 PCM byte strings (mono, `input_rate` Hz).
+        """
+        process = await asyncio.create_subprocess_exec(
+            *self._command(input_rate),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+
+        async def feed():
+            try:
+                async for pcm in pcm_chunks:
+                    process.stdin.write(pcm)
+                    await process.stdin.drain()
+            finally:
+                process.stdin.close()
+
+        # Feed and read concurrently so neither pipe fills up and blocks ffmpeg
+        feeder = asyncio.create_task(feed())
+        try:
+            while True:
+                data = await process.stdout.read(16384)
+                if not data:
+                    break
+                yield data
+            await feeder
+            stderr = await process.stderr.read()
+            if await process.wait() != 0:
+                raise RuntimeError(f"ffmpeg failed: {stderr.decode(errors='replace').strip()}")
+        finally:
+            if not feeder.done():
+                feeder.cancel()
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
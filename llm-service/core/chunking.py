@@ -0,0 +1,147 @@
+import os
+import re
+
+# Sentence end: . ! ? (optionally followed by quotes/brackets) and whitespace
+_SENTENCE_END = re.compile(r'(?<=[.!?])["\')\]]*\s+')
+
+
+def iter_paragraphs(path):
+    """
+    Stream a text file as paragraphs (blocks separated by blank lines).
+    """
+    lines = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                lines.append(line.strip())
+            elif lines:
+                yield " ".join(lines)
+                lines = []
+    if lines:
+        yield " ".join(lines)
+
+
+def split_sentences(paragraph):
+    return [s.strip() for s in _SENTENCE_END.split(paragraph) if s.strip()]
+
+
+class TokenChunker:
+    """
+    Chunks text by the embedder's own tokenizer so every chunk fits the
+    embedding model's sequence limit (all-MiniLM-L6-v2 truncates at 256
+    word-pieces).
+
+    Sentences are packed greedily up to `chunk_tokens`; a new paragraph only
+    joins the current chunk if it fits, and the trailing sentences up to
+    `overlap_tokens` are repeated at the start of the next chunk. Sentences
+    longer than a chunk are cut at word boundaries. Paragraphs are tokenized
+    in batches, so large corpora go through the fast tokenizer in bulk.
+    """
+
+    def __init__(self, tokenizer, max_seq_length=256, chunk_tokens=None, overlap_tokens=None, batch_paragraphs=64):
+        self.tokenizer = tokenizer
+        # Leave room for [CLS] / [SEP]
+        limit = max_seq_length - 2
+        self.chunk_tokens = min(int(chunk_tokens or os.getenv("CHUNK_TOKENS", "200")), limit)
+        self.overlap_tokens = int(overlap_tokens if overlap_tokens is not None else os.getenv("CHUNK_OVERLAP_TOKENS", "30"))
+        self.batch_paragraphs = batch_paragraphs
+
+    @property
+    def signature(self):
+        """
+        Identifies the chunking settings; stored in the ingestion manifest so a
+        settings change re-chunks files even if they did not change.
+        """
+        return f"tokens:{self.chunk_tokens}:{self.overlap_tokens}"
+
+    def count_tokens(self, texts):
+        encoded = self.tokenizer(texts, add_special_tokens=False)["input_ids"]
+        return [len(ids) for ids in encoded]
+
+    def chunk_text(self, text):
+        paragraphs = [p.strip() for p in re.split(r"\n\s*\n", text) if p.strip()]
+        return list(self.chunk_paragraphs(" ".join(p.split()) for p in paragraphs))
+
+    def chunk_paragraphs(self, paragraphs):
+        """
+        Generate chunks from an iterable of paragraphs, tokenizing in batches.
+        """
+        state = {"units": [], "tokens": 0}
+        batch = []
+        for paragraph in paragraphs:
+            batch.append(paragraph)
+            if len(batch) >= self.batch_paragraphs:
+                yield from self._pack_batch(batch, state)
+                batch = []
+        if batch:
+            yield from self._pack_batch(batch, state)
+        if state["units"]:
+            yield self._join(state["units"])
+
+    def _pack_batch(self, paragraphs, state):
+        sentences = []
+        for index, paragraph in enumerate(paragraphs):
+            for sentence in split_sentences(paragraph):
+                sentences.append((index, sentence))
+        if not sentences:
+            return
+        counts = self.count_tokens([sentence for _, sentence in sentences])
+
+        previous = None
+        for (index, sentence), count in zip(sentences, counts):
+            new_paragraph = index != previous
+            previous = index
+            pieces = [(sentence, count)] if count <= self.chunk_tokens else self._split_long(sentence)
+            for piece, piece_count in pieces:
+                # Close the chunk before a sentence that would overflow it
+                if state["units"] and state["tokens"] + piece_count > self.chunk_tokens:
+                    yield self._join(state["units"])
+                    self._keep_overlap(state, piece_count)
+                    new_paragraph = False
+                state["units"].append((piece, piece_count, new_paragraph))
+                state["tokens"] += piece_count
+                new_paragraph = False
+
+    def _keep_overlap(self, state, incoming):
+        overlap, total = [], 0
+        for piece, count, _ in reversed(state["units"]):
+            if total + count > self.overlap_tokens:
+                break
+            overlap.insert(0, (piece, count, False))
+            total += count
+        # The overlap plus the incoming piece must still fit in one chunk
+        while overlap and total + incoming > self.chunk_tokens:
+            total -= overlap.pop(0)[1]
+        state["units"], state["tokens"] = overlap, total
+
+    def _split_long(self, sentence):
+        """
+        Cut an over-long sentence into chunk-sized pieces at word starts.
+        """
+        encoded = self.tokenizer(sentence, add_special_tokens=False, return_offsets_mapping=True)
+        offsets = encoded["offset_mapping"]
+        pieces = []
+        start_token = 0
+        while start_token < len(offsets):
+            end_token = min(start_token + self.chunk_tokens, len(offsets))
+            if end_token < len(offsets):
+                # Back off to a token that starts a new word
+                cut = end_token
+                while cut > start_token + 1 and offsets[cut][0] == offsets[cut - 1][1]:
+                    cut -= 1
+                if cut > start_token + 1:
+                    end_token = cut
+            char_start = offsets[start_token][0]
+            char_end = offsets[end_token - 1][1]
+            pieces.append((sentence[char_start:char_end].strip(), end_token - start_token))
+            start_token = end_token
+        return [(text, count) for text, count in pieces if text]
+
+    @staticmethod
+    def _join(units):
+        text = ""
+        for piece, _, new_paragraph in units:
+            if text:
+                text += "\n\n" if new_paragraph else " "
+            text += piece
+        return text
@@ -0,0 +1,50 @@
+import os
+from core.chunking import split_sentences
+
+
+class ContextPacker:
+    """
+    Builds the RAG context for a prompt within a token budget.
+
+    Hits are taken in relevance order and split into sentences; sentences
+    already packed from a higher-ranked chunk (chunk overlaps, duplicate
+    chunks) are dropped, and each chunk is cut at the first sentence that no
+    longer fits. Sizes are measured with the LLM's tokenizer, so the budget
+    bounds prefill cost directly.
+    """
+
+    def __init__(self, tokenizer, token_budget=None, top_k=None):
+        self.tokenizer = tokenizer
+        self.token_budget = token_budget or int(os.getenv("CONTEXT_TOKEN_BUDGET", "768"))
+        self.top_k = top_k or int(os.getenv("CONTEXT_TOP_K", "5"))
+
+    def pack(self, hits):
+        """
+        Return (context_text, context_tokens) for hits sorted best first.
+        """
+        seen = set()
+        parts = []
+        used = 0
+        for hit in hits[:self.top_k]:
+            sentences = []
+            for sentence in split_sentences(" ".join(hit["document"].split())):
+                key = sentence.lower()
+                if key not in seen:
+                    seen.add(key)
+                    sentences.append(sentence)
+            if not sentences:
+                continue
+
+            # "\n\n" between chunks and " " between sentences cost about a token each
+            counts = [len(ids) + 1 for ids in self.tokenizer(sentences, add_special_tokens=False)["input_ids"]]
+            kept = []
+            for sentence, count in zip(sentences, counts):
+                if used + count > self.token_budget:
+                    break
+                kept.append(sentence)
+                used += count
+            if kept:
+                parts.append(" ".join(kept))
+            if used >= self.token_budget:
+                break
+        return "\n\n".join(parts), used
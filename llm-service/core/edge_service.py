@@ -3,6 +3,9 @@ import io
 import asyncio
 
 class EdgeTTSEngine:
+    name = "edge"
+    media_type = "audio/mp3"
+
     def __init__(self):
         print("Initializing EdgeTTS Engine...")
         # British Male: en-GB-RyanNeural or en-GB-ThomasNeural
@@ -10,15 +13,22 @@ class EdgeTTSEngine:
         self.voice = "en-GB-RyanNeural" 
         print(f"EdgeTTS using voice: {self.voice}")
 
+    async def stream_async(self, text):
+        """
+        Yield MP3 chunks as edge-tts delivers them, without buffering the
+        utterance. Errors are raised to the consumer, which decides whether
+        they happen before or after the first byte was sent.
+        """
+        communicate = edge_tts.Communicate(text, self.voice)
+        async for chunk in communicate.stream():
+            if chunk["type"] == "audio" and chunk["data"]:
+                yield chunk["data"]
+
     async def generate_async(self, text):
         try:
-            communicate = edge_tts.Communicate(text, self.voice)
-            audio_data = b""
-            async for chunk in communicate.stream():
-                if chunk["type"] == "audio":
-                    audio_data += chunk["data"]
-            
-            return io.BytesIO(audio_data)
+            # Collect the chunks and join once (no repeated bytes concatenation)
+            chunks = [chunk async for chunk in self.stream_async(text)]
+            return io.BytesIO(b"".join(chunks))
         except Exception as e:
             print(f"EdgeTTS Error: {e}")
             return None
@@ -0,0 +1,106 @@
+import os
+import time
+import queue
+from collections import OrderedDict
+from concurrent.futures import Future
+from threading import Thread, Lock
+
+
+class BatchingEmbedder:
+    """
+    Micro-batching front end for SentenceTransformer query encoding.
+
+    Concurrent submit() calls are collected for up to `max_wait_ms` (or until
+    `max_batch_size` queries are waiting) and encoded in one forward pass on a
+    background thread. Each caller gets a Future for its own vector. Exact
+    repeat queries are answered from a small LRU without touching the model.
+    """
+
+    def __init__(self, model, max_batch_size=None, max_wait_ms=None, cache_size=None):
+        self.model = model
+        self.max_batch_size = max_batch_size or int(os.getenv("EMBED_MAX_BATCH_SIZE", "32"))
+        self.max_wait = (max_wait_ms if max_wait_ms is not None else float(os.getenv("EMBED_MAX_WAIT_MS", "3"))) / 1000
+        self.cache_size = cache_size if cache_size is not None else int(os.getenv("EMBED_CACHE_SIZE", "1024"))
+        self._cache = OrderedDict()
+        self._lock = Lock()
+        self._queue = queue.Queue()
+        self.batches = 0
+        self.encoded = 0
+        self.cache_hits = 0
+
+        self._thread = Thread(target=self._run, daemon=True, name="embed-batcher")
+        self._thread.start()
+
+    def submit(self, query):
+        """
+        Return a concurrent.futures.Future resolving to the query's embedding.
+        """
+        future = Future()
+        with self._lock:
+            vector = self._cache.get(query)
+            if vector is not None:
+                self._cache.move_to_end(query)
+                self.cache_hits += 1
+        if vector is not None:
+            future.set_result(vector)
+        else:
+            self._queue.put((query, future))
+        return future
+
+    def encode(self, query):
+        """
+        Blocking single-query encode through the batcher.
+        """
+        return self.submit(query).result()
+
+    def _run(self):
+        while True:
+            try:
+                batch = [self._queue.get()]
+                deadline = time.monotonic() + self.max_wait
+                while len(batch) < self.max_batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(self._queue.get(timeout=remaining))
+                    except queue.Empty:
+                        break
+                # Drop callers that went away; the rest can no longer be cancelled
+                batch = [(query, future) for query, future in batch if future.set_running_or_notify_cancel()]
+                if batch:
+                    self._encode_batch(batch)
+            except Exception as e:
+                # One bad batch must not take the batcher (and every later query) down
+                print(f"Embedding batch failed: {e}")
+
+    def _encode_batch(self, batch):
+        # The same query may be queued twice in one window; encode it once
+        queries = list(dict.fromkeys(query for query, _ in batch))
+        try:
+            vectors = self.model.encode(queries, batch_size=len(queries))
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        by_query = dict(zip(queries, vectors))
+        with self._lock:
+            for query, vector in by_query.items():
+                self._cache[query] = vector
+                self._cache.move_to_end(query)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        self.batches += 1
+        self.encoded += len(queries)
+        for query, future in batch:
+            future.set_result(by_query[query])
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "encoded": self.encoded,
+            "avg_batch_size": round(self.encoded / self.batches, 2) if self.batches else 0.0,
+            "cache_hits": self.cache_hits,
+            "cached": len(self._cache),
+        }
@@ -0,0 +1,279 @@
+import os
+import csv
+import time
+import queue
+import hashlib
+from uuid import uuid4
+from threading import Thread, Event
+from core.chunking import iter_paragraphs
+
+# Sources are (path, kind); kind selects the streaming chunker and metadata
+TEXT = "text"
+QA_PAIR = "qa_pair"
+
+_DONE = object()
+
+
+class IngestionJob:
+    """
+    Progress and outcome of one ingestion run, as reported by /rag/ingest/{job_id}.
+    """
+
+    def __init__(self):
+        self.id = uuid4().hex
+        self.status = "queued"
+        self.files_total = 0
+        self.files_done = 0
+        self.files_skipped = 0
+        self.chunks_seen = 0
+        self.chunks_embedded = 0
+        self.chunks_reused = 0
+        self.chunks_removed = 0
+        self.errors = []
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def active(self):
+        return self.status in ("queued", "running")
+
+    def to_dict(self):
+        end = self.finished_at or time.time()
+        elapsed = end - self.started_at if self.started_at else 0.0
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "files_total": self.files_total,
+            "files_done": self.files_done,
+            "files_skipped": self.files_skipped,
+            "chunks_seen": self.chunks_seen,
+            "chunks_embedded": self.chunks_embedded,
+            "chunks_reused": self.chunks_reused,
+            "chunks_removed": self.chunks_removed,
+            "elapsed_seconds": round(elapsed, 3),
+            "chunks_per_second": round(self.chunks_embedded / elapsed, 1) if elapsed else 0.0,
+            "errors": self.errors,
+        }
+
+
+def hash_file(path, block_size=1 << 20):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def iter_qa_chunks(path):
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        for row in csv.DictReader(f):
+            question = (row.get('Question') or '').strip()
+            answer = (row.get('Answer') or '').strip()
+            if question and answer:
+                # Format: "Q: <Question>\nA: <Answer>"
+                yield f"Q: {question}\nA: {answer}"
+
+
+class IngestionPipeline:
+    """
+    Producer/consumer ingestion over many sources.
+
+    reader+chunker thread -> bounded queue -> embedder thread (fixed-size
+    batches across files, skipping chunks already stored) -> bounded queue
+    -> writer (batched collection.add). Memory is bounded by the queue sizes,
+    not by file sizes. The manifest is only committed once every stage has
+    finished, so a failed run is simply redone next time.
+    """
+
+    def __init__(self, engine, job, batch_size=None, queue_batches=4):
+        self.engine = engine
+        self.job = job
+        self.batch_size = batch_size or int(os.getenv("INGEST_BATCH_SIZE", "64"))
+        self._chunks = queue.Queue(maxsize=self.batch_size * queue_batches)
+        self._batches = queue.Queue(maxsize=queue_batches)
+        self._stop = Event()
+        self._pending = {}
+        # Chunks already queued from files that failed partway; never in the manifest
+        self._failed_ids = set()
+
+    def run(self, sources, prune_root=None):
+        """
+        Ingest `sources` and, if `prune_root` is given, drop manifest sources
+        under it that are not in `sources`. Returns True if the collection changed.
+        """
+        job = self.job
+        job.status = "running"
+        job.started_at = job.started_at or time.time()
+        job.files_total += len(sources)
+        manifest = self.engine._load_manifest()
+
+        stages = [
+            Thread(target=self._guard, args=(self._produce, manifest, sources), daemon=True),
+            Thread(target=self._guard, args=(self._embed,), daemon=True),
+        ]
+        for stage in stages:
+            stage.start()
+        self._guard(self._write)
+        for stage in stages:
+            stage.join()
+        if self._stop.is_set():
+            raise RuntimeError("; ".join(job.errors) or "ingestion pipeline failed")
+
+        changed = job.chunks_embedded > 0
+        for path, entry in self._pending.items():
+            old = manifest["sources"].get(path)
+            manifest["sources"][path] = entry
+            if old:
+                changed |= self._remove_unused(manifest, set(old["ids"]) - set(entry["ids"]))
+        # Written chunks of a failed file are dropped unless another source uses them
+        changed |= self._remove_unused(manifest, self._failed_ids)
+
+        if prune_root is not None:
+            present = {os.path.abspath(path) for path, _ in sources}
+            root = os.path.abspath(prune_root) + os.sep
+            for path in list(manifest["sources"]):
+                if path.startswith(root) and path not in present:
+                    entry = manifest["sources"].pop(path)
+                    changed |= self._remove_unused(manifest, set(entry["ids"]))
+                    print(f"Removed deleted source {path}")
+
+        self.engine._save_manifest(manifest)
+        return changed
+
+    def _guard(self, stage, *args):
+        try:
+            stage(*args)
+        except Exception as e:
+            self.job.errors.append(f"{stage.__name__.strip('_')}: {e}")
+            self._stop.set()
+
+    def _put(self, q, item):
+        # Bounded put that gives up if another stage failed
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q):
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _produce(self, manifest, sources):
+        try:
+            for path, kind in sources:
+                if self._stop.is_set():
+                    return
+                ids = {}
+                try:
+                    self._produce_source(manifest, path, kind, ids)
+                except (OSError, UnicodeDecodeError, csv.Error) as e:
+                    # A broken file is reported and left out; the rest continues
+                    self.job.errors.append(f"{path}: {e}")
+                    self._failed_ids.update(ids)
+                self.job.files_done += 1
+        finally:
+            self._put(self._chunks, _DONE)
+
+    def _produce_source(self, manifest, file_path, kind, ids):
+        """
+        Queue the chunks of one source, recording their ids in `ids` as they go.
+        """
+        path = os.path.abspath(file_path)
+        stat = os.stat(path)
+        chunker = QA_PAIR if kind == QA_PAIR else self.engine.chunker.signature
+        entry = manifest["sources"].get(path)
+        if entry and entry.get("chunker") != chunker:
+            # Chunking settings changed since this file was ingested
+            entry = dict(entry, mtime=None, hash=None)
+        if entry and entry["mtime"] == stat.st_mtime and entry["size"] == stat.st_size:
+            self.job.files_skipped += 1
+            return
+
+        file_hash = hash_file(path)
+        if entry and entry["hash"] == file_hash:
+            # Touched but not edited
+            entry["mtime"] = stat.st_mtime
+            self.job.files_skipped += 1
+            return
+
+        metadata = {"source": file_path}
+        if kind == QA_PAIR:
+            metadata["type"] = "qa_pair"
+            chunks = iter_qa_chunks(path)
+        else:
+            chunks = self.engine.chunker.chunk_paragraphs(iter_paragraphs(path))
+
+        for chunk in chunks:
+            chunk_id = self.engine._content_id(chunk)
+            if chunk_id in ids:
+                continue
+            ids[chunk_id] = None
+            self.job.chunks_seen += 1
+            if not self._put(self._chunks, (chunk_id, chunk, metadata)):
+                return
+        self._pending[path] = {
+            "mtime": stat.st_mtime, "size": stat.st_size, "hash": file_hash, "chunker": chunker, "ids": list(ids)
+        }
+        print(f"Chunked {file_path}: {len(ids)} chunks")
+
+    def _embed(self):
+        collection = self.engine.collection
+        queued = set()
+        batch = []
+        done = False
+        while not done:
+            item = self._get(self._chunks)
+            if item is _DONE:
+                done = True
+            elif item[0] in queued:
+                # Same chunk already queued from another file in this run
+                self.job.chunks_reused += 1
+            else:
+                queued.add(item[0])
+                batch.append(item)
+            if batch and (done or len(batch) >= self.batch_size):
+                ids = [chunk_id for chunk_id, _, _ in batch]
+                stored = set(collection.get(ids=ids, include=[])["ids"])
+                fresh = [item for item in batch if item[0] not in stored]
+                self.job.chunks_reused += len(batch) - len(fresh)
+                if fresh:
+                    documents = [chunk for _, chunk, _ in fresh]
+                    embeddings = self.engine.embedder.encode(documents, batch_size=len(documents)).tolist()
+                    if not self._put(self._batches, (fresh, embeddings)):
+                        return
+                batch = []
+        self._put(self._batches, _DONE)
+
+    def _write(self):
+        while True:
+            item = self._get(self._batches)
+            if item is _DONE:
+                return
+            fresh, embeddings = item
+            self.engine.collection.add(
+                ids=[chunk_id for chunk_id, _, _ in fresh],
+                documents=[chunk for _, chunk, _ in fresh],
+                metadatas=[dict(metadata) for _, _, metadata in fresh],
+                embeddings=embeddings
+            )
+            self.job.chunks_embedded += len(fresh)
+
+    def _remove_unused(self, manifest, candidate_ids):
+        """
+        Delete ids no source in the manifest references any more.
+        """
+        used = set()
+        for entry in manifest["sources"].values():
+            used.update(entry["ids"])
+        stale = list(candidate_ids - used)
+        if stale:
+            self.engine.collection.delete(ids=stale)
+            self.job.chunks_removed += len(stale)
+        return bool(stale)
@@ -0,0 +1,131 @@
+import os
+import re
+import json
+import numpy as np
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    return _TOKEN.findall(text.lower())
+
+
+class BM25Index:
+    """
+    In-process BM25 inverted index over the knowledge base.
+
+    Postings are stored as flat arrays (CSR layout: per-term offsets into
+    doc ids and term frequencies), snapshotted to `snapshot_dir` next to the
+    vector data and reloaded with mmap. A query touches only the postings of
+    its own terms, so keyword lookups need no embedding forward pass.
+    """
+
+    def __init__(self, snapshot_dir, k1=1.5, b=0.75):
+        self.snapshot_dir = snapshot_dir
+        self.k1 = k1
+        self.b = b
+        # (vocab, offsets, doc_ids, tfs, idf, length_norm, documents, metadatas), swapped as one unit
+        self._data = ({}, None, None, None, None, None, [], [])
+        # Identifies the collection contents the snapshot was built from
+        self.fingerprint = None
+
+    def __len__(self):
+        return len(self._data[6])
+
+    def _path(self, name):
+        return os.path.join(self.snapshot_dir, name)
+
+    def build(self, documents, metadatas, fingerprint=None):
+        """
+        Build postings for `documents`, write a snapshot and mmap it.
+        `fingerprint` is stored with it so a later load can tell if it is stale.
+        """
+        postings = {}
+        doc_lens = np.zeros(len(documents), dtype=np.int32)
+        for doc_id, document in enumerate(documents):
+            tokens = tokenize(document)
+            doc_lens[doc_id] = len(tokens)
+            counts = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, count in counts.items():
+                postings.setdefault(token, []).append((doc_id, count))
+
+        vocab = sorted(postings)
+        offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+        for i, term in enumerate(vocab):
+            offsets[i + 1] = offsets[i] + len(postings[term])
+        doc_ids = np.empty(offsets[-1], dtype=np.int32)
+        tfs = np.empty(offsets[-1], dtype=np.uint16)
+        for i, term in enumerate(vocab):
+            entries = np.asarray(postings[term], dtype=np.int64).reshape(-1, 2)
+            doc_ids[offsets[i]:offsets[i + 1]] = entries[:, 0]
+            tfs[offsets[i]:offsets[i + 1]] = np.minimum(entries[:, 1], np.iinfo(np.uint16).max)
+
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        for name, array in (("offsets.npy", offsets), ("doc_ids.npy", doc_ids), ("tfs.npy", tfs), ("doc_lens.npy", doc_lens)):
+            self._save(name, array)
+        meta = {"vocab": vocab, "fingerprint": fingerprint, "documents": list(documents), "metadatas": [m or {} for m in metadatas]}
+        tmp_path = self._path("meta.json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self._path("meta.json"))
+        return self.load()
+
+    def _save(self, name, array):
+        # Write then rename so readers never mmap a half-written file
+        tmp_path = self._path(name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            np.save(f, array)
+        os.replace(tmp_path, self._path(name))
+
+    def load(self):
+        """
+        Memory-map an existing snapshot. Returns False if there is none.
+        """
+        meta_path = self._path("meta.json")
+        if not os.path.exists(meta_path):
+            return False
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        offsets = np.load(self._path("offsets.npy"), mmap_mode="r")
+        doc_ids = np.load(self._path("doc_ids.npy"), mmap_mode="r")
+        tfs = np.load(self._path("tfs.npy"), mmap_mode="r")
+        doc_lens = np.load(self._path("doc_lens.npy")).astype(np.float32)
+
+        n_docs = len(doc_lens)
+        df = np.diff(offsets).astype(np.float32)
+        idf = np.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+        avg_len = doc_lens.mean() if n_docs else 1.0
+        length_norm = self.k1 * (1 - self.b + self.b * doc_lens / (avg_len or 1.0))
+        vocab = {term: i for i, term in enumerate(meta["vocab"])}
+        self._data = (vocab, offsets, doc_ids, tfs, idf, length_norm, meta["documents"], meta["metadatas"])
+        self.fingerprint = meta.get("fingerprint")
+        return True
+
+    def query(self, text, n_results=1):
+        """
+        Return the top-k hits as dicts with document, metadata and BM25 score
+        (larger is better). Documents sharing no term with the query are left out.
+        """
+        vocab, offsets, doc_ids, tfs, idf, length_norm, documents, metadatas = self._data
+        if not documents:
+            return []
+        scores = np.zeros(len(documents), dtype=np.float32)
+        for term in set(tokenize(text)):
+            i = vocab.get(term)
+            if i is None:
+                continue
+            start, end = offsets[i], offsets[i + 1]
+            docs = doc_ids[start:end]
+            tf = tfs[start:end].astype(np.float32)
+            # A term's postings hold each document once, so fancy-index add is safe
+            scores[docs] += idf[i] * tf * (self.k1 + 1) / (tf + length_norm[docs])
+
+        matched = np.flatnonzero(scores)
+        if not len(matched):
+            return []
+        k = min(n_results, len(matched))
+        top = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        top = top[np.argsort(-scores[top])]
+        return [{"document": documents[i], "metadata": metadatas[i], "score": float(scores[i])} for i in top]
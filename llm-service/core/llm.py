@@ -1,35 +1,98 @@
 import os
+import time
 import torch
 from dotenv import load_dotenv
-from transformers import AutoModelForCausalLM, AutoTokenizer, TextIteratorStreamer
-from threading import Thread
+from transformers import AutoModelForCausalLM, AutoTokenizer, TextIteratorStreamer, AsyncTextIteratorStreamer
+from core.scheduler import BatchScheduler
+from core.workers import run_cpu
+from core import snapshots
+from core import metrics
 
 # Load env from parent dir if needed, or current
 base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 load_dotenv(os.path.join(base_path, ".env"))
 
+MODEL_ID = "Qwen/Qwen2.5-0.5B-Instruct"
+
+# LLM_PROFILE -> dtype the weights are loaded in. "int8" loads fp32 and then
+# dynamically quantizes the Linear layers (CPU only).
+PROFILE_DTYPES = {
+    "auto": "auto",
+    "fp32": torch.float32,
+    "bf16": torch.bfloat16,
+    "int8": torch.float32,
+}
+
+def configure_threads():
+    """
+    Apply LLM_NUM_THREADS / LLM_INTEROP_THREADS to torch, if set.
+    """
+    num_threads = os.getenv("LLM_NUM_THREADS")
+    interop_threads = os.getenv("LLM_INTEROP_THREADS")
+    if num_threads:
+        torch.set_num_threads(int(num_threads))
+    if interop_threads:
+        try:
+            torch.set_interop_threads(int(interop_threads))
+        except RuntimeError as e:
+            # Only allowed before any inter-op parallel work has started
+            print(f"Could not set inter-op threads: {e}")
+    print(f"Torch threads: intra-op={torch.get_num_threads()}, inter-op={torch.get_num_interop_threads()}")
+
 class LLMEngine:
-    def __init__(self):
+    def __init__(self, start=True):
         print("Initializing Qwen Engine...")
         
-        self.model_id = "Qwen/Qwen2.5-0.5B-Instruct"
+        self.model_id = MODEL_ID
         print(f"Target Model: {self.model_id}")
 
         try:
+            # Exported by export_models.py: loads offline, straight from local safetensors
+            self.snapshot = snapshots.resolve("llm", self.model_id)
+            source = self.snapshot["path"] if self.snapshot else self.model_id
+            if self.snapshot is None:
+                print("No local snapshot, loading from the hub (run export_models.py for offline starts)")
+
             # Load Tokenizer
-            self.tokenizer = AutoTokenizer.from_pretrained(self.model_id)
+            self.tokenizer = AutoTokenizer.from_pretrained(source, local_files_only=self.snapshot is not None)
             
+            # Inference profile: dtype / quantization, threads, compile
+            self.profile = os.getenv("LLM_PROFILE", "auto").lower()
+            if self.profile not in PROFILE_DTYPES:
+                raise ValueError(f"Unknown LLM_PROFILE '{self.profile}', expected one of {list(PROFILE_DTYPES)}")
+            dtype = PROFILE_DTYPES[self.profile]
+            if self.snapshot and dtype != "auto" and str(dtype) != f"torch.{self.snapshot['dtype']}":
+                print(f"Snapshot is {self.snapshot['dtype']}, converting to {dtype} (re-export to skip the copy)")
+
             # Load Model
             # device_map="auto" will use GPU if available
             # torch_dtype="auto" will use fp16 if available
-            print("Loading model... (this might download on first run)")
+            print(f"Loading model with profile '{self.profile}'... (this might download on first run)")
             self.model = AutoModelForCausalLM.from_pretrained(
-                self.model_id,
-                torch_dtype="auto",
-                device_map="auto"
+                source,
+                torch_dtype=dtype,
+                device_map="auto",
+                local_files_only=self.snapshot is not None
             )
+            self.model.eval()
+
+            if self.profile == "int8":
+                if self.model.device.type != "cpu":
+                    raise ValueError("LLM_PROFILE=int8 (dynamic quantization) is only supported on CPU")
+                self.model = torch.ao.quantization.quantize_dynamic(
+                    self.model, {torch.nn.Linear}, dtype=torch.qint8
+                )
+
+            if os.getenv("LLM_COMPILE", "").lower() in ("1", "true"):
+                # Shapes change every step (batch size, cache length), so compile dynamically
+                self.model.forward = torch.compile(self.model.forward, dynamic=True)
+                print("Model forward wrapped with torch.compile.")
             print("Qwen model loaded successfully.")
 
+            self.scheduler = None
+            if start:
+                self.start()
+
         except Exception as e:
             print(f"Failed to load model: {e}")
             # Ensure we log this visibly
@@ -37,44 +100,106 @@ class LLMEngine:
                 f.write(f"Startup Error: {e}\n")
             raise e
 
-    def stream_chat(self, messages, temperature=0.7):
+    def start(self):
         """
-        Stream response using TextIteratorStreamer.
+        Apply the thread settings and start the scheduler. Kept apart from
+        loading so a pre-fork parent (core/prefork.py) loads weights without
+        starting any threads.
         """
+        configure_threads()
+        # All requests share one scheduler thread that batches decode steps
+        self.scheduler = BatchScheduler(self.model)
+
+    def _encode(self, messages):
+        start = time.perf_counter()
+        # Apply Chat Template
+        # Qwen supports apply_chat_template
+        text = self.tokenizer.apply_chat_template(
+            messages,
+            tokenize=False,
+            add_generation_prompt=True
+        )
+        input_ids = self.tokenizer([text], return_tensors="pt").input_ids
+        metrics.PROMPT_BUILD_SECONDS.observe(time.perf_counter() - start)
+        print(f"Prompt tokens: {input_ids.shape[-1]}")
+        return input_ids
+
+    def stream_chat(self, messages, temperature=0.7, max_new_tokens=512):
+        """
+        Stream response using TextIteratorStreamer, fed by the batch scheduler.
+        """
+        request = None
         try:
-            # Apply Chat Template
-            # Qwen supports apply_chat_template
-            text = self.tokenizer.apply_chat_template(
-                messages,
-                tokenize=False,
-                add_generation_prompt=True
-            )
-            
-            model_inputs = self.tokenizer([text], return_tensors="pt").to(self.model.device)
+            input_ids = self._encode(messages)
 
-            # Streamer setup
-            streamer = TextIteratorStreamer(self.tokenizer, skip_prompt=True, skip_special_tokens=True)
-            
-            # Generate kwargs
-            generate_kwargs = dict(
-                model_inputs,
-                streamer=streamer,
-                max_new_tokens=512,
+            # Streamer setup (only generated tokens are pushed, so no prompt to skip)
+            streamer = TextIteratorStreamer(self.tokenizer, skip_special_tokens=True)
+
+            # Join the running batch instead of starting a generate thread per request
+            request = self.scheduler.submit(
+                input_ids,
+                streamer,
+                max_new_tokens=max_new_tokens,
                 temperature=temperature,
-                do_sample=True, # required for temperature
             )
 
-            # Run generation in a separate thread so we can yield from streamer
-            t = Thread(target=self.model.generate, kwargs=generate_kwargs)
-            t.start()
-
             # Yield tokens as they appear
             for new_text in streamer:
                 yield new_text
 
         except Exception as e:
+            metrics.ERRORS.labels("llm").inc()
+            yield f"Error generating response: {e}"
+
+        finally:
+            # Consumer went away (or we failed): stop generating for this request
+            if request is not None:
+                request.cancel()
+
+    async def stream_chat_async(self, messages, temperature=0.7, max_new_tokens=512):
+        """
+        Async variant of stream_chat. Tokens arrive through an asyncio.Queue
+        (AsyncTextIteratorStreamer), so no thread blocks waiting on the next token.
+        """
+        request = None
+        try:
+            input_ids = await run_cpu(self._encode, messages)
+            streamer = AsyncTextIteratorStreamer(self.tokenizer, skip_special_tokens=True)
+            request = self.scheduler.submit(
+                input_ids,
+                streamer,
+                max_new_tokens=max_new_tokens,
+                temperature=temperature,
+            )
+            async for new_text in streamer:
+                yield new_text
+
+        except Exception as e:
+            metrics.ERRORS.labels("llm").inc()
             yield f"Error generating response: {e}"
 
+        finally:
+            # Client disconnected (generator closed/cancelled): free the batch slot
+            if request is not None:
+                request.cancel()
+
+    def warm_prefix(self, system_prefix):
+        """
+        Precompute the KV cache for a fixed leading part of the system prompt.
+        Every request whose rendered prompt starts with it skips that prefill.
+        """
+        # Render through the chat template with a marker so the prefix matches
+        # exactly what stream_chat will tokenize.
+        marker = "<<DEXTORA_PREFIX_END>>"
+        text = self.tokenizer.apply_chat_template(
+            [{"role": "system", "content": system_prefix + marker}],
+            tokenize=False,
+            add_generation_prompt=False
+        )
+        prefix_text = text[:text.index(marker)]
+        input_ids = self.tokenizer([prefix_text], return_tensors="pt").input_ids
+        self.scheduler.pin_prefix(input_ids)
+
     def chat(self, messages, temperature=0.7):
         # Non-streaming fallback
         full_response = ""
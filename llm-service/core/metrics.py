@@ -0,0 +1,189 @@
+import bisect
+from threading import Lock
+
+# Seconds; covers sub-millisecond stages up to full generations
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Per-token decode steps
+TOKEN_BUCKETS = (0.005, 0.01, 0.02, 0.03, 0.05, 0.075, 0.1, 0.15, 0.25, 0.5, 1.0)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for value in labels.values())
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _CounterValue:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0
+        self._lock = Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+class _HistogramValue:
+    __slots__ = ("buckets", "counts", "sum", "_lock")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # One slot per bucket plus the +Inf overflow; made cumulative at render time
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = Lock()
+
+    def observe(self, value, count=1):
+        """
+        Record `count` observations of `value` (a batched decode step records
+        one step time for every stream in the batch at once).
+        """
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += count
+            self.sum += value * count
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = Lock()
+        self._default = None if self.labelnames else self._new_value()
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_value())
+        return child
+
+    def _series(self):
+        if self._default is not None:
+            return [({}, self._default)]
+        return [(dict(zip(self.labelnames, key)), child) for key, child in list(self._children.items())]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_value(self):
+        return _CounterValue()
+
+    def inc(self, amount=1):
+        self._default.inc(amount)
+
+    def samples(self):
+        return [(self.name, labels, child.value) for labels, child in self._series()]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help, labelnames)
+
+    def _new_value(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value, count=1):
+        self._default.observe(value, count)
+
+    def samples(self):
+        samples = []
+        for labels, child in self._series():
+            with child._lock:
+                counts, total = list(child.counts), child.sum
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                samples.append((f"{self.name}_bucket", dict(labels, le=_format_value(float(bound))), cumulative))
+            samples.append((f"{self.name}_sum", labels, total))
+            samples.append((f"{self.name}_count", labels, cumulative))
+        return samples
+
+
+class Registry:
+    """
+    Process-wide metrics in the Prometheus text format.
+
+    Hot paths only take a short uncontended lock to bump a number; anything
+    that already keeps its own statistics (caches, queues) is read through a
+    collector when /metrics is scraped instead of being counted twice.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, help, labelnames=()):
+        metric = Counter(name, help, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        metric = Histogram(name, help, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def collector(self, fn):
+        """
+        Register `fn()`, called per scrape; it yields (name, kind, help, [(labels, value)]).
+        """
+        self._collectors.append(fn)
+        return fn
+
+    def render(self):
+        lines = []
+        families = [(m.name, m.kind, m.help, m.samples()) for m in self._metrics]
+        for fn in self._collectors:
+            for name, kind, help, series in fn():
+                families.append((name, kind, help, [(name, labels, value) for labels, value in series]))
+        for name, kind, help, samples in families:
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for sample_name, labels, value in samples:
+                lines.append(f"{sample_name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+EMBED_SECONDS = REGISTRY.histogram(
+    "rag_embed_seconds", "Query embedding latency, including the micro-batching wait")
+VECTOR_QUERY_SECONDS = REGISTRY.histogram(
+    "rag_vector_query_seconds", "Nearest-neighbour query latency")
+CONTEXT_PACK_SECONDS = REGISTRY.histogram(
+    "chat_context_pack_seconds", "Packing retrieved chunks into the context token budget")
+PROMPT_BUILD_SECONDS = REGISTRY.histogram(
+    "llm_prompt_build_seconds", "Chat template rendering and prompt tokenization")
+PREFILL_SECONDS = REGISTRY.histogram(
+    "llm_prefill_seconds", "Prompt prefill forward pass")
+TTFT_SECONDS = REGISTRY.histogram(
+    "llm_time_to_first_token_seconds", "From scheduler submit to the first sampled token")
+INTER_TOKEN_SECONDS = REGISTRY.histogram(
+    "llm_inter_token_seconds", "Time per generated token in the decode loop", buckets=TOKEN_BUCKETS)
+GENERATION_SECONDS = REGISTRY.histogram(
+    "llm_generation_seconds", "From scheduler submit to the end of a completed generation")
+CHAT_FIRST_CHUNK_SECONDS = REGISTRY.histogram(
+    "chat_time_to_first_chunk_seconds", "From /chat request arrival to the first answer chunk", ("path",))
+TTS_SYNTHESIS_SECONDS = REGISTRY.histogram(
+    "tts_synthesis_seconds", "Full synthesis of one text (cache misses only)", ("backend",))
+TOKENS_GENERATED = REGISTRY.counter(
+    "llm_tokens_generated_total", "Tokens sampled by the LLM scheduler")
+ERRORS = REGISTRY.counter(
+    "errors_total", "Failed generations and syntheses", ("source",))
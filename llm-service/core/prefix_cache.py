@@ -0,0 +1,80 @@
+import os
+from collections import OrderedDict
+from threading import Lock
+
+
+class PrefixCache:
+    """
+    Reusable prompt KV states keyed by token-id prefix.
+
+    Pinned entries (e.g. the static Dextora rules block) are never evicted.
+    Recent full prompts live in a small LRU so other repeated fragments (same
+    retrieved context, same question) also skip most of their prefill.
+    Because attention is causal, the KV of any prefix of a stored entry is a
+    slice of that entry, so lookups use the longest common token prefix.
+    """
+
+    def __init__(self, max_entries=None, min_tokens=16):
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv("LLM_PREFIX_CACHE_SIZE", "4"))
+        self.min_tokens = min_tokens
+        self._pinned = {}
+        self._entries = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.tokens_reused = 0
+
+    @staticmethod
+    def _common_length(a, b):
+        n = min(a.shape[-1], b.shape[-1])
+        if n == 0:
+            return 0
+        return int((a[0, :n] == b[0, :n]).long().cumprod(dim=0).sum())
+
+    def pin(self, input_ids, kv):
+        with self._lock:
+            self._pinned[tuple(input_ids[0].tolist())] = (input_ids, kv)
+
+    def insert(self, input_ids, kv):
+        if self.max_entries <= 0 or input_ids.shape[-1] < self.min_tokens:
+            return
+        key = tuple(input_ids[0].tolist())
+        with self._lock:
+            self._entries[key] = (input_ids, kv)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def lookup(self, input_ids):
+        """
+        Return (n, kv) where kv holds the cached states for the first n tokens
+        of `input_ids`. At least one token is always left for the caller to
+        prefill so it gets logits. Returns (0, None) on a miss.
+        """
+        limit = input_ids.shape[-1] - 1
+        best_length, best_key, best_kv, pinned = 0, None, None, False
+        with self._lock:
+            for is_pinned, entries in ((True, self._pinned), (False, self._entries)):
+                for key, (ids, kv) in entries.items():
+                    length = min(self._common_length(ids, input_ids), limit)
+                    if length > best_length:
+                        best_length, best_key, best_kv, pinned = length, key, kv, is_pinned
+            if best_length < self.min_tokens:
+                self.misses += 1
+                return 0, None
+            if not pinned:
+                self._entries.move_to_end(best_key)
+
+        self.hits += 1
+        self.tokens_reused += best_length
+        sliced = [(k[:, :, :best_length], v[:, :, :best_length]) for k, v in best_kv]
+        return best_length, sliced
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "tokens_reused": self.tokens_reused,
+            "pinned": len(self._pinned),
+            "entries": len(self._entries),
+        }
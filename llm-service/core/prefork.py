@@ -0,0 +1,109 @@
+import os
+import gc
+import time
+import signal
+import socket
+import uvicorn
+
+
+def thread_budget(workers):
+    """
+    Torch threads per worker, so the workers together use each core once.
+    """
+    return max(1, (os.cpu_count() or 1) // workers)
+
+
+def serve(app, host, port, workers=1, preload=None):
+    """
+    Serve `app` from `workers` forked uvicorn processes sharing one socket.
+
+    `preload()` runs once in the parent before forking: weights it loads are
+    shared copy-on-write by every worker instead of loaded per process. It
+    must not start threads (they do not survive fork); workers start their
+    own. Each worker gets LLM_NUM_THREADS (default: cores / workers).
+    """
+    if workers > 1:
+        # Only paid in pre-fork mode; a single process binds its port without it
+        import torch
+        if torch.cuda.is_available():
+            # A CUDA context cannot be shared with forked children
+            print("WEB_WORKERS > 1 is CPU only; serving from a single process.")
+            workers = 1
+    if workers <= 1:
+        uvicorn.run(app, host=host, port=port)
+        return
+
+    # The parent never runs parallel torch work: forking after the intra-op
+    # pool has started can deadlock the children
+    torch.set_num_threads(1)
+    # Empty counts as unset: .env.example ships LLM_NUM_THREADS= blank
+    if not os.getenv("LLM_NUM_THREADS"):
+        os.environ["LLM_NUM_THREADS"] = str(thread_budget(workers))
+    print(f"Pre-fork: {workers} workers, {os.environ['LLM_NUM_THREADS']} torch threads each")
+
+    if preload:
+        start = time.time()
+        preload()
+        print(f"Pre-fork: preloaded in {time.time() - start:.1f}s")
+    # Move everything loaded so far out of the collector's reach, so GC passes
+    # in the workers don't write to (and so copy) the shared pages
+    gc.freeze()
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    children = {}
+    stopping = False
+
+    def spawn(index):
+        pid = os.fork()
+        if pid == 0:
+            _run_worker(app, sock, host, port)
+        children[pid] = index
+        print(f"Pre-fork: worker {index} started (pid {pid})")
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    for index in range(workers):
+        spawn(index)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        index = children.pop(pid, None)
+        if index is not None and not stopping:
+            print(f"Pre-fork: worker {index} (pid {pid}) exited with status {status}, restarting")
+            time.sleep(1)
+            spawn(index)
+    sock.close()
+
+
+def _run_worker(app, sock, host, port):
+    # uvicorn installs its own handlers; drop the parent's supervisor ones
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    code = 0
+    try:
+        config = uvicorn.Config(app, host=host, port=port)
+        uvicorn.Server(config).run(sockets=[sock])
+    except Exception as e:
+        print(f"Worker {os.getpid()} failed: {e}")
+        code = 1
+    finally:
+        # Never fall back into the parent's supervisor loop
+        os._exit(code)
@@ -2,20 +2,212 @@ import chromadb
 from sentence_transformers import SentenceTransformer
 import os
 import glob
-import csv
-from uuid import uuid4
+import json
+import time
+import uuid
+import hashlib
+import asyncio
+from collections import OrderedDict
+from contextlib import contextmanager
+from threading import Thread, Lock
+from core.workers import run_cpu
+from core.embedding import BatchingEmbedder
+from core.vector_index import NumpyIndex
+from core.lexical import BM25Index
+from core.ingestion import IngestionJob, IngestionPipeline, TEXT, QA_PAIR
+from core.chunking import TokenChunker
+from core import snapshots
+from core import metrics
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: no pre-fork workers there, so the in-process job dedupe is enough
+    fcntl = None
+
+EMBED_MODEL_ID = "sentence-transformers/all-MiniLM-L6-v2"
+
+def load_embedder():
+    """
+    The embedding model from its local snapshot (export_models.py) when there
+    is one, so startup needs no hub lookups; otherwise by hub id.
+    """
+    snapshot = snapshots.resolve("embedder", EMBED_MODEL_ID)
+    if snapshot:
+        return SentenceTransformer(snapshot["path"], local_files_only=True)
+    return SentenceTransformer(EMBED_MODEL_ID)
+
+def load_vector_index(persist_directory="chroma_db"):
+    """
+    The VECTOR_BACKEND=numpy snapshot, mapped but not yet checked against the
+    collection (RAGEngine does that), or None when the backend is off or there
+    is no snapshot. Lets a pre-fork parent load it once for every worker.
+    """
+    if os.getenv("VECTOR_BACKEND", "chroma").lower() != "numpy":
+        return None
+    index = NumpyIndex(os.path.join(persist_directory, "numpy_index"))
+    return index if index.load() else None
 
 class RAGEngine:
-    def __init__(self, persist_directory="chroma_db"):
+    def __init__(self, persist_directory="chroma_db", embedder=None, index=None):
         print("Initializing RAG Engine...")
-        self.client = chromadb.PersistentClient(path=persist_directory)
-        self.collection = self.client.get_or_create_collection(name="knowledge_base")
-        self.embedder = SentenceTransformer('all-MiniLM-L6-v2')
+        self.persist_directory = persist_directory
+        self.manifest_path = os.path.join(persist_directory, "ingest_manifest.json")
+        self.ingest_lock_path = os.path.join(persist_directory, "ingest.lock")
+        # Rewritten after every ingestion, so other processes sharing the
+        # directory (pre-fork workers) notice it and reload
+        self.stamp_path = os.path.join(persist_directory, "kb_stamp")
+        self.jobs = OrderedDict()
+        self._jobs_lock = Lock()
+        self._sync_lock = Lock()
+        os.makedirs(persist_directory, exist_ok=True)
+        # Workers starting together on a new directory would both create its schema
+        with self._ingest_lock():
+            self.client = chromadb.PersistentClient(path=persist_directory)
+            self.collection = self.client.get_or_create_collection(name="knowledge_base")
+        # Passed in when a pre-fork parent already loaded it (shared copy-on-write)
+        self.embedder = embedder or load_embedder()
+        # Text chunks are sized in the embedder's own tokens so none get truncated
+        self.chunker = TokenChunker(self.embedder.tokenizer, self.embedder.max_seq_length)
+        # Query-time encodes from concurrent requests share one forward pass
+        self.query_embedder = BatchingEmbedder(self.embedder)
+        # Bumped after every ingestion so dependent caches can invalidate
+        self.kb_version = 0
+        # Called (from the ingestion thread) after an ingestion changed the collection
+        self.ingestion_listeners = []
+
+        # Optional in-process index: VECTOR_BACKEND=numpy answers queries from a
+        # normalized matrix snapshot instead of round-tripping through Chroma
+        self.index = None
+        if os.getenv("VECTOR_BACKEND", "chroma").lower() == "numpy":
+            # Passed in when a pre-fork parent already loaded the snapshot
+            self.index = index or NumpyIndex(os.path.join(persist_directory, "numpy_index"))
+
+        # RETRIEVAL_MODE=hybrid fuses BM25 and vector rankings; LEXICAL_FAST_PATH=1
+        # answers queries with a decisive BM25 winner without embedding them
+        self.retrieval_mode = os.getenv("RETRIEVAL_MODE", "vector").lower()
+        self.lexical_fast_path = os.getenv("LEXICAL_FAST_PATH", "0") == "1"
+        self.lexical_min_score = float(os.getenv("LEXICAL_MIN_SCORE", "8.0"))
+        self.lexical_decisive_ratio = float(os.getenv("LEXICAL_DECISIVE_RATIO", "1.5"))
+        self.lexical = None
+        if self.retrieval_mode == "hybrid" or self.lexical_fast_path:
+            self.lexical = BM25Index(os.path.join(persist_directory, "bm25_index"))
+
+        # Workers starting together must not rebuild the same snapshot at once
+        with self._ingest_lock():
+            self.kb_stamp = self._read_stamp()
+            self._load_indexes()
         print("RAG Engine ready.")
 
-    def ingest_data(self, data_dir="data"):
+    def _load_indexes(self):
         """
-        Read .txt files from data/company and data/competitors and index them.
+        Load the index snapshots, rebuilding any that does not match the
+        collection (e.g. it was ingested by a process with the index disabled).
+        """
+        fingerprint = self._collection_fingerprint()
+        for name, index, rebuild in (
+            ("vector index", self.index, self.refresh_index),
+            ("BM25 index", self.lexical, self.refresh_lexical),
+        ):
+            if index is None:
+                continue
+            if index.fingerprint == fingerprint or (index.load() and index.fingerprint == fingerprint):
+                print(f"Loaded {name} snapshot ({len(index)} entries).")
+            else:
+                rebuild()
+
+    def _read_stamp(self):
+        try:
+            with open(self.stamp_path, 'r', encoding='utf-8') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _write_stamp(self):
+        tmp_path = self.stamp_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(uuid.uuid4().hex)
+        os.replace(tmp_path, self.stamp_path)
+        self.kb_stamp = self._read_stamp()
+
+    def is_stale(self):
+        """
+        True if another process ingested since this one last loaded the knowledge base.
+        """
+        return self._read_stamp() != self.kb_stamp
+
+    def sync(self):
+        """
+        Pick up an ingestion finished by another process (a pre-fork worker or
+        ingest_standalone.py): reopen the collection, reload the index snapshots
+        and bump kb_version. Skipped while an ingestion is still running.
+        """
+        with self._sync_lock:
+            with self._ingest_lock(wait=False) as locked:
+                if locked and self.is_stale():
+                    self._reload()
+
+    def _reload(self):
+        # Caller holds the ingest lock. Chroma caches one client per path and
+        # that client never sees other processes' writes, so open a fresh one
+        self.kb_stamp = self._read_stamp()
+        self.client.clear_system_cache()
+        self.client = chromadb.PersistentClient(path=self.persist_directory)
+        self.collection = self.client.get_or_create_collection(name="knowledge_base")
+        self._load_indexes()
+        self.kb_version += 1
+        print("Knowledge base reloaded after an ingestion in another process.")
+
+    def _collection_fingerprint(self, ids=None):
+        """
+        Hash of the collection's sorted chunk ids. Ids are content hashes, so any
+        edit changes it, even one that leaves the chunk count the same.
+        """
+        if ids is None:
+            ids = self.collection.get(include=[])["ids"]
+        return hashlib.sha256("\n".join(sorted(ids)).encode("utf-8")).hexdigest()
+
+    def refresh_index(self):
+        """
+        Rebuild the in-process index (if enabled) from the Chroma collection.
+        """
+        if self.index is None:
+            return
+        data = self.collection.get(include=["embeddings", "documents", "metadatas"])
+        self.index.build(
+            data["embeddings"], data["documents"], data["metadatas"],
+            fingerprint=self._collection_fingerprint(data["ids"])
+        )
+        print(f"Vector index rebuilt ({len(self.index)} vectors).")
+
+    def refresh_lexical(self):
+        """
+        Rebuild the BM25 index (if enabled) from the Chroma collection.
+        """
+        if self.lexical is None:
+            return
+        data = self.collection.get(include=["documents", "metadatas"])
+        self.lexical.build(data["documents"], data["metadatas"], fingerprint=self._collection_fingerprint(data["ids"]))
+        print(f"BM25 index rebuilt ({len(self.lexical)} documents).")
+
+    def _ingestion_finished(self):
+        # Caller holds the ingest lock, so other processes reload complete snapshots
+        self.refresh_index()
+        self.refresh_lexical()
+        self._write_stamp()
+        self.kb_version += 1
+        for listener in self.ingestion_listeners:
+            try:
+                listener()
+            except Exception as e:
+                print(f"Ingestion listener failed: {e}")
+
+    def ingest_data(self, data_dir="data", job=None):
+        """
+        Read .txt files and Q&A CSVs under data_dir and index them.
+        Incremental: unchanged files are skipped via the ingestion manifest,
+        only new chunks are embedded, and chunks of edited or deleted files
+        are removed. Progress is recorded on `job`.
         """
         # Resolve path relative to this file if default is used
         if data_dir == "data":
@@ -24,91 +216,233 @@ class RAGEngine:
             
         print(f"Ingesting from: {data_dir}")
         files = glob.glob(os.path.join(data_dir, "**", "*.txt"), recursive=True)
-        print(f"Found {len(files)} files to ingest.")
-        
-        for file_path in files:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # Simple chunking by paragraphs or fixed size
-            chunks = self._chunk_text(content)
-            
-            if not chunks:
-                continue
-                
-            ids = [str(uuid4()) for _ in chunks]
-            embeddings = self.embedder.encode(chunks).tolist()
-            metadatas = [{"source": file_path} for _ in chunks]
-            
-            self.collection.add(
-                documents=chunks,
-                embeddings=embeddings,
-                metadatas=metadatas,
-                ids=ids
-            )
-            print(f"Ingested {len(chunks)} chunks from {file_path}")
-
-        # Ingest CSVs
         csv_files = glob.glob(os.path.join(data_dir, "**", "*.csv"), recursive=True)
-        print(f"Found {len(csv_files)} CSV files to ingest.")
-        for csv_file in csv_files:
-            self.ingest_csv(csv_file)
+        print(f"Found {len(files)} text files and {len(csv_files)} CSV files.")
+
+        sources = [(path, TEXT) for path in files] + [(path, QA_PAIR) for path in csv_files]
+        return self._run_pipeline(sources, job, prune_root=data_dir)
 
-    def ingest_csv(self, file_path):
+    def ingest_csv(self, file_path, refresh=True, job=None):
         """
         Ingest Q&A CSV. Format: Question, Answer
+        `refresh=False` defers the index refresh to the caller (batch ingestion).
         """
         print(f"Ingesting CSV: {file_path}")
-        ids = []
-        documents = []
-        metadatas = []
-        
+        return self._run_pipeline([(file_path, QA_PAIR)], job, refresh=refresh)
+
+    @contextmanager
+    def _ingest_lock(self, wait=True):
+        """
+        Serialize ingestion across processes (pre-fork workers, ingest_standalone.py)
+        that share this Chroma directory and manifest. Yields False instead of
+        waiting when `wait` is off and another holder has it.
+        """
+        if fcntl is None:
+            yield True
+            return
+        with open(self.ingest_lock_path, "a") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                if not wait:
+                    yield False
+                    return
+                print("Knowledge base locked by another process (ingesting or starting up); waiting...")
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _run_pipeline(self, sources, job=None, prune_root=None, refresh=True):
+        job = job or IngestionJob()
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    question = row.get('Question', '').strip()
-                    answer = row.get('Answer', '').strip()
-                    
-                    if question and answer:
-                        # Format: "Q: <Question>\nA: <Answer>"
-                        full_text = f"Q: {question}\nA: {answer}"
-                        
-                        ids.append(str(uuid4()))
-                        documents.append(full_text)
-                        metadatas.append({"source": file_path, "type": "qa_pair"})
-            
-            if documents:
-                embeddings = self.embedder.encode(documents).tolist()
-                self.collection.add(
-                    documents=documents,
-                    embeddings=embeddings,
-                    metadatas=metadatas,
-                    ids=ids
-                )
-                print(f"Ingested {len(documents)} Q&A pairs from {file_path}")
-                
+            with self._ingest_lock():
+                if self.is_stale():
+                    # Build on what another process ingested, not a stale client
+                    self._reload()
+                changed = IngestionPipeline(self, job).run(sources, prune_root=prune_root)
+                if changed and refresh:
+                    self._ingestion_finished()
+            job.status = "completed"
+            print(f"Ingestion finished: {job.to_dict()}")
         except Exception as e:
-            print(f"Error ingesting CSV {file_path}: {e}")
+            job.status = "failed"
+            if str(e) not in job.errors:
+                job.errors.append(str(e))
+            print(f"Ingestion failed: {e}")
+        finally:
+            job.finished_at = time.time()
+        return job
+
+    def start_ingest_job(self, data_dir="data"):
+        """
+        Start ingestion in a background thread. If a job is already running it
+        is returned instead. Returns (job, started).
+        """
+        with self._jobs_lock:
+            running = next((job for job in self.jobs.values() if job.active), None)
+            if running:
+                return running, False
+            job = IngestionJob()
+            self.jobs[job.id] = job
+            # Keep only recent jobs
+            while len(self.jobs) > 20:
+                self.jobs.popitem(last=False)
+        Thread(target=self.ingest_data, args=(data_dir, job), daemon=True).start()
+        return job, True
+
+    def get_ingest_job(self, job_id):
+        return self.jobs.get(job_id)
+
+    @staticmethod
+    def _content_id(text):
+        """
+        Deterministic chunk id: identical text always maps to the same id.
+        """
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+
+    def _load_manifest(self):
+        """
+        Manifest of ingested sources: path -> mtime, size, content hash, chunk ids.
+        """
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
 
-    def _chunk_text(self, text, chunk_size=500):
+        # First incremental run: drop chunks stored under random uuid4 ids by
+        # older versions, otherwise they would stay duplicated forever
+        legacy_ids = [i for i in self.collection.get(include=[])["ids"] if "-" in i]
+        if legacy_ids:
+            print(f"Removing {len(legacy_ids)} legacy chunks with random ids.")
+            self.collection.delete(ids=legacy_ids)
+        return {"sources": {}}
+
+    def _save_manifest(self, manifest):
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self.manifest_path)
+
+    def embed_query(self, query):
         """
-        Simple overlapping chunker.
+        Embed a single query string.
         """
-        words = text.split()
-        chunks = []
-        for i in range(0, len(words), chunk_size - 50): # 50 word overlap
-            chunk = " ".join(words[i:i + chunk_size])
-            chunks.append(chunk)
-        return chunks
+        start = time.perf_counter()
+        embedding = self.query_embedder.encode(query)
+        metrics.EMBED_SECONDS.observe(time.perf_counter() - start)
+        return embedding
 
-    def retrieve(self, query, n_results=1):
+    def retrieve(self, query, n_results=1, query_embedding=None):
         """
         Retrieve relevant context for a query.
+        Pass `query_embedding` to reuse a vector from embed_query().
+        """
+        hits = self.retrieve_with_scores(query, n_results, query_embedding)
+        return [hit["document"] for hit in hits]
+
+    def retrieve_with_scores(self, query, n_results=1, query_embedding=None):
+        """
+        Retrieve the nearest chunks as dicts with document, metadata and distance
+        (smaller is closer). Hits found only lexically have distance None.
         """
-        query_embedding = self.embedder.encode([query]).tolist()
+        if query_embedding is None and self.lexical_fast_path:
+            hits = self.lexical_lookup(query, n_results)
+            if hits:
+                return hits
+        if query_embedding is None:
+            query_embedding = self.embed_query(query)
+        if self.retrieval_mode != "hybrid" or self.lexical is None:
+            return self._vector_search(query_embedding, n_results)
+
+        # Fuse a deeper candidate list from each side
+        candidates = max(n_results * 4, 10)
+        return self._fuse(
+            self._vector_search(query_embedding, candidates),
+            self.lexical.query(query, candidates),
+            n_results
+        )
+
+    def _vector_search(self, query_embedding, n_results):
+        start = time.perf_counter()
+        if self.index is not None:
+            hits = self.index.query(query_embedding, n_results)
+            metrics.VECTOR_QUERY_SECONDS.observe(time.perf_counter() - start)
+            return hits
         results = self.collection.query(
-            query_embeddings=query_embedding,
-            n_results=n_results
+            query_embeddings=[query_embedding.tolist()],
+            n_results=n_results,
+            include=["documents", "metadatas", "distances"]
         )
-        return results["documents"][0] if results["documents"] else []
+        metrics.VECTOR_QUERY_SECONDS.observe(time.perf_counter() - start)
+        if not results["documents"]:
+            return []
+        return [
+            {"document": document, "metadata": metadata or {}, "distance": distance}
+            for document, metadata, distance in zip(
+                results["documents"][0], results["metadatas"][0], results["distances"][0]
+            )
+        ]
+
+    @staticmethod
+    def _fuse(vector_hits, lexical_hits, n_results, k=60):
+        """
+        Reciprocal rank fusion: score = sum of 1 / (k + rank) over both rankings.
+        Documents are matched by text, which is also what their ids are derived from.
+        """
+        fused = {}
+        for hits in (vector_hits, lexical_hits):
+            for rank, hit in enumerate(hits):
+                entry = fused.setdefault(hit["document"], {
+                    "document": hit["document"], "metadata": hit["metadata"], "distance": None, "fused_score": 0.0
+                })
+                entry["fused_score"] += 1.0 / (k + rank + 1)
+                if "distance" in hit:
+                    entry["distance"] = hit["distance"]
+        return sorted(fused.values(), key=lambda hit: -hit["fused_score"])[:n_results]
+
+    def lexical_lookup(self, query, n_results=1):
+        """
+        BM25 hits if the lexical match is decisive (top score above
+        LEXICAL_MIN_SCORE and LEXICAL_DECISIVE_RATIO times the runner-up),
+        otherwise None. Needs no embedding.
+        """
+        if self.lexical is None:
+            return None
+        hits = self.lexical.query(query, max(n_results, 2))
+        if not hits or hits[0]["score"] < self.lexical_min_score:
+            return None
+        if len(hits) > 1 and hits[0]["score"] < self.lexical_decisive_ratio * hits[1]["score"]:
+            return None
+        return [dict(hit, distance=None) for hit in hits[:n_results]]
+
+    async def embed_query_async(self, query):
+        # Await the batcher's future directly; no worker thread sits waiting
+        start = time.perf_counter()
+        embedding = await asyncio.wrap_future(self.query_embedder.submit(query))
+        metrics.EMBED_SECONDS.observe(time.perf_counter() - start)
+        return embedding
+
+    async def retrieve_async(self, query, n_results=1, query_embedding=None):
+        """
+        Non-blocking retrieve_with_scores(); runs on the CPU worker pool.
+        """
+        return await run_cpu(self.retrieve_with_scores, query, n_results, query_embedding)
+
+    def qa_answers(self):
+        """
+        All answers from ingested Q&A pairs.
+        """
+        data = self.collection.get(where={"type": "qa_pair"}, include=["documents", "metadatas"])
+        hits = [{"document": d, "metadata": m or {}} for d, m in zip(data["documents"], data["metadatas"])]
+        return [answer for answer in map(self.qa_answer, hits) if answer]
+
+    @staticmethod
+    def qa_answer(hit):
+        """
+        Return the stored answer of a qa_pair hit, or None for other chunks.
+        """
+        if hit["metadata"].get("type") != "qa_pair":
+            return None
+        _, sep, answer = hit["document"].partition("\nA: ")
+        return answer.strip() if sep else None
@@ -0,0 +1,105 @@
+import os
+import re
+import time
+import numpy as np
+from collections import OrderedDict
+from threading import Lock
+
+
+class _Entry:
+    def __init__(self, embedding, text, generation_time, kb_version):
+        self.embedding = embedding
+        self.text = text
+        self.generation_time = generation_time
+        self.kb_version = kb_version
+        self.created = time.time()
+
+
+class ResponseCache:
+    """
+    Semantic cache of full /chat answers keyed by the query embedding.
+
+    A lookup hits when a stored query has cosine similarity >= threshold,
+    is younger than the TTL and was answered against the current knowledge
+    base version. Size is bounded with LRU eviction.
+    """
+
+    def __init__(self, threshold=None, ttl=None, max_entries=None):
+        self.threshold = threshold if threshold is not None else float(os.getenv("RESPONSE_CACHE_THRESHOLD", "0.92"))
+        self.ttl = ttl if ttl is not None else float(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv("RESPONSE_CACHE_SIZE", "256"))
+        self._entries = OrderedDict()
+        self._next_key = 0
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+    @staticmethod
+    def _normalize(embedding):
+        embedding = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(embedding)
+        return embedding / norm if norm else embedding
+
+    def lookup(self, embedding, kb_version):
+        """
+        Return the cached answer text for a similar query, or None.
+        """
+        query = self._normalize(embedding)
+        now = time.time()
+        with self._lock:
+            # Drop entries that are expired or belong to an older knowledge base
+            stale = [
+                key for key, entry in self._entries.items()
+                if entry.kb_version != kb_version or now - entry.created > self.ttl
+            ]
+            for key in stale:
+                del self._entries[key]
+
+            best_key, best_score = None, self.threshold
+            if self._entries:
+                keys = list(self._entries.keys())
+                matrix = np.stack([self._entries[key].embedding for key in keys])
+                scores = matrix @ query
+                index = int(np.argmax(scores))
+                if scores[index] >= best_score:
+                    best_key, best_score = keys[index], float(scores[index])
+
+            if best_key is None:
+                self.misses += 1
+                return None
+
+            entry = self._entries[best_key]
+            self._entries.move_to_end(best_key)
+            self.hits += 1
+            self.saved_seconds += entry.generation_time
+            return entry.text
+
+    def store(self, embedding, text, generation_time, kb_version):
+        with self._lock:
+            self._entries[self._next_key] = _Entry(self._normalize(embedding), text, generation_time, kb_version)
+            self._next_key += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+            "saved_generation_seconds": round(self.saved_seconds, 3),
+        }
+
+
+def replay_stream(text):
+    """
+    Re-emit a cached answer in word-sized chunks, like the live token stream.
+    """
+    for piece in re.findall(r"\S+\s*|\s+", text):
+        yield piece
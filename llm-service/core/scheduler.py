@@ -0,0 +1,388 @@
+import os
+import time
+import queue
+import torch
+import torch.nn.functional as F
+from threading import Thread, Event
+from transformers import DynamicCache
+from core.prefix_cache import PrefixCache
+from core.speculative import prompt_lookup_draft, verify_draft_token
+from core import metrics
+from transformers.generation import (
+    LogitsProcessorList,
+    RepetitionPenaltyLogitsProcessor,
+    TemperatureLogitsWarper,
+    TopKLogitsWarper,
+    TopPLogitsWarper,
+)
+
+
+def _cache_to_tensors(cache):
+    """
+    Flatten a HF cache object into a list of (key, value) tensors per layer.
+    """
+    if hasattr(cache, "layers"):
+        return [(layer.keys, layer.values) for layer in cache.layers]
+    if hasattr(cache, "to_legacy_cache"):
+        return list(cache.to_legacy_cache())
+    return list(cache)
+
+
+def _tensors_to_cache(kv):
+    """
+    Wrap per-layer (key, value) tensors back into a DynamicCache (no copy).
+    """
+    if hasattr(DynamicCache, "from_legacy_cache"):
+        return DynamicCache.from_legacy_cache(tuple(kv))
+    return DynamicCache(kv)
+
+
+def _pad_left(kv, mask, pad):
+    """
+    Left-pad a batched KV cache and its attention mask by `pad` positions.
+    """
+    if pad <= 0:
+        return kv, mask
+    kv = [(F.pad(k, (0, 0, pad, 0)), F.pad(v, (0, 0, pad, 0))) for k, v in kv]
+    return kv, F.pad(mask, (pad, 0))
+
+
+class GenerationRequest:
+    def __init__(self, input_ids, streamer, max_new_tokens, temperature):
+        self.input_ids = input_ids
+        self.streamer = streamer
+        self.max_new_tokens = max_new_tokens
+        self.temperature = temperature
+        self.token_ids = input_ids
+        self.next_token = None
+        self.position = input_ids.shape[-1]
+        self.generated = 0
+        self.processors = None
+        self.cancelled = Event()
+        self.submitted_at = time.perf_counter()
+
+    def cancel(self):
+        """
+        Ask the scheduler to stop this request; it leaves the batch before the next decode step.
+        """
+        self.cancelled.set()
+
+
+class BatchScheduler:
+    """
+    Continuous (iteration-level) batching over a single causal LM.
+
+    One background thread owns the model. Every iteration it admits waiting
+    requests (prefilled one by one, then merged into the running batch) and
+    runs a single batched decode step for all active requests. Finished
+    requests leave the batch immediately, so new ones never wait for the
+    slowest stream. Each request streams through its own TextIteratorStreamer.
+    Prefill starts from the longest matching prefix in `prefix_cache`.
+
+    With LLM_SPECULATIVE=prompt_lookup, a lone active request decodes
+    speculatively: tokens drafted by n-gram lookup over its own prompt are
+    verified in one forward pass. Larger batches use the plain decode step.
+    """
+
+    def __init__(self, model, max_batch_size=None, prefix_cache=None):
+        self.model = model
+        self.prefix_cache = prefix_cache if prefix_cache is not None else PrefixCache()
+        self.device = model.device
+        self.max_batch_size = max_batch_size or int(os.getenv("LLM_MAX_BATCH_SIZE", "32"))
+
+        speculative = os.getenv("LLM_SPECULATIVE", "").lower() == "prompt_lookup"
+        self.speculative_tokens = int(os.getenv("LLM_SPEC_NUM_TOKENS", "10")) if speculative else 0
+        self.speculative_max_ngram = int(os.getenv("LLM_SPEC_MAX_NGRAM", "3"))
+
+        eos = model.generation_config.eos_token_id
+        self.eos_token_ids = set(eos if isinstance(eos, (list, tuple)) else [eos])
+
+        self._pending = queue.Queue()
+        self._active = []
+        self._kv = None
+        self._mask = None
+        self.cancelled_requests = 0
+        self.tokens_saved = 0
+        self.draft_tokens = 0
+        self.accepted_draft_tokens = 0
+
+        self._thread = Thread(target=self._run, daemon=True, name="llm-scheduler")
+        self._thread.start()
+        print(f"Batch scheduler started (max_batch_size={self.max_batch_size}, speculative_tokens={self.speculative_tokens}).")
+
+    def submit(self, input_ids, streamer, max_new_tokens=512, temperature=0.7):
+        """
+        Queue a prompt (1 x L token ids) for generation. Tokens are pushed into
+        `streamer` as they are sampled and `streamer.end()` is called when done.
+        """
+        request = GenerationRequest(input_ids.to(self.device), streamer, max_new_tokens, temperature)
+        request.processors = self._logits_processor(request)
+        self._pending.put(request)
+        return request
+
+    @torch.no_grad()
+    def pin_prefix(self, input_ids):
+        """
+        Precompute and pin the KV states of a fixed prompt prefix (1 x L ids).
+        """
+        input_ids = input_ids.to(self.device)
+        out = self.model(input_ids=input_ids, use_cache=True)
+        self.prefix_cache.pin(input_ids, _cache_to_tensors(out.past_key_values))
+        print(f"Pinned prompt prefix of {input_ids.shape[-1]} tokens.")
+
+    def _logits_processor(self, request):
+        config = self.model.generation_config
+        processors = LogitsProcessorList()
+        if config.repetition_penalty and config.repetition_penalty != 1.0:
+            processors.append(RepetitionPenaltyLogitsProcessor(config.repetition_penalty))
+        if request.temperature and request.temperature != 1.0:
+            processors.append(TemperatureLogitsWarper(request.temperature))
+        if config.top_k:
+            processors.append(TopKLogitsWarper(config.top_k))
+        if config.top_p is not None and config.top_p < 1.0:
+            processors.append(TopPLogitsWarper(config.top_p))
+        return processors
+
+    def _sample(self, request, logits):
+        """
+        Sample the next token for one request from its (1 x V) logits row.
+        """
+        if not request.temperature:
+            return int(logits.argmax(dim=-1))
+        scores = request.processors(request.token_ids, logits.float())
+        probs = torch.softmax(scores, dim=-1)
+        return int(torch.multinomial(probs, num_samples=1))
+
+    def _emit(self, request, token):
+        """
+        Record a sampled token and stream it. Returns True if the request is done.
+        """
+        request.generated += 1
+        request.next_token = token
+        request.token_ids = torch.cat(
+            [request.token_ids, torch.tensor([[token]], device=self.device)], dim=-1
+        )
+        if token in self.eos_token_ids:
+            return True
+        request.streamer.put(torch.tensor([token]))
+        return request.generated >= request.max_new_tokens
+
+    def _finish(self, request, error=None):
+        if error is not None:
+            metrics.ERRORS.labels("llm").inc()
+            request.streamer.on_finalized_text(f"Error generating response: {error}")
+        elif not request.cancelled.is_set():
+            metrics.GENERATION_SECONDS.observe(time.perf_counter() - request.submitted_at)
+        request.streamer.end()
+
+    def _cancel(self, request):
+        self.cancelled_requests += 1
+        self.tokens_saved += request.max_new_tokens - request.generated
+        self._finish(request)
+
+    def stats(self):
+        return {
+            "active": len(self._active),
+            "pending": self._pending.qsize(),
+            "cancelled_requests": self.cancelled_requests,
+            "tokens_saved": self.tokens_saved,
+            "draft_tokens": self.draft_tokens,
+            "accepted_draft_tokens": self.accepted_draft_tokens,
+            "prefix_cache": self.prefix_cache.stats(),
+        }
+
+    def _run(self):
+        while True:
+            try:
+                self._admit()
+                if self._active:
+                    self._decode_step()
+            except Exception as e:
+                print(f"Scheduler step failed: {e}")
+                for request in self._active:
+                    self._finish(request, error=e)
+                self._active, self._kv, self._mask = [], None, None
+
+    def _admit(self):
+        """
+        Pull waiting requests into the batch. Blocks only when nothing is running.
+        """
+        while len(self._active) < self.max_batch_size:
+            try:
+                request = self._pending.get(block=not self._active)
+            except queue.Empty:
+                return
+            if request.cancelled.is_set():
+                self._cancel(request)
+                continue
+            try:
+                self._prefill(request)
+            except Exception as e:
+                print(f"Prefill failed: {e}")
+                self._finish(request, error=e)
+
+    @torch.no_grad()
+    def _prefill(self, request):
+        start = time.perf_counter()
+        cached, past = self.prefix_cache.lookup(request.input_ids)
+        if cached:
+            print(f"Prefix cache hit: reused {cached}/{request.position} prompt tokens")
+            out = self.model(
+                input_ids=request.input_ids[:, cached:],
+                past_key_values=_tensors_to_cache(past),
+                use_cache=True,
+            )
+        else:
+            out = self.model(input_ids=request.input_ids, use_cache=True)
+        kv = _cache_to_tensors(out.past_key_values)
+        self.prefix_cache.insert(request.input_ids, kv)
+
+        token = self._sample(request, out.logits[:, -1, :])
+        now = time.perf_counter()
+        metrics.PREFILL_SECONDS.observe(now - start)
+        metrics.TTFT_SECONDS.observe(now - request.submitted_at)
+        metrics.TOKENS_GENERATED.inc()
+        if self._emit(request, token):
+            self._finish(request)
+            return
+
+        mask = torch.ones((1, request.position), dtype=torch.long, device=self.device)
+        if not self._active:
+            self._kv, self._mask = kv, mask
+        else:
+            length, batch_length = mask.shape[1], self._mask.shape[1]
+            self._kv, self._mask = _pad_left(self._kv, self._mask, length - batch_length)
+            kv, mask = _pad_left(kv, mask, batch_length - length)
+            self._kv = [
+                (torch.cat([bk, k], dim=0), torch.cat([bv, v], dim=0))
+                for (bk, bv), (k, v) in zip(self._kv, kv)
+            ]
+            self._mask = torch.cat([self._mask, mask], dim=0)
+        self._active.append(request)
+
+    @torch.no_grad()
+    def _decode_step(self):
+        # Drop abandoned requests before spending a forward pass on them
+        live = [i for i, r in enumerate(self._active) if not r.cancelled.is_set()]
+        if len(live) < len(self._active):
+            for request in self._active:
+                if request.cancelled.is_set():
+                    self._cancel(request)
+            self._evict(live)
+            if not self._active:
+                return
+
+        start = time.perf_counter()
+        if self.speculative_tokens and len(self._active) == 1:
+            request = self._active[0]
+            generated = request.generated
+            if self._speculative_step():
+                # Several tokens per step: record the step time spread over them
+                emitted = request.generated - generated
+                metrics.TOKENS_GENERATED.inc(emitted)
+                metrics.INTER_TOKEN_SECONDS.observe((time.perf_counter() - start) / emitted, emitted)
+                return
+
+        batch = len(self._active)
+        input_ids = torch.tensor([[r.next_token] for r in self._active], device=self.device)
+        position_ids = torch.tensor([[r.position] for r in self._active], device=self.device)
+        mask = torch.cat(
+            [self._mask, torch.ones((batch, 1), dtype=self._mask.dtype, device=self.device)], dim=1
+        )
+
+        out = self.model(
+            input_ids=input_ids,
+            attention_mask=mask,
+            position_ids=position_ids,
+            past_key_values=_tensors_to_cache(self._kv),
+            use_cache=True,
+        )
+        self._kv = _cache_to_tensors(out.past_key_values)
+        self._mask = mask
+
+        logits = out.logits[:, -1, :]
+        keep = []
+        for i, request in enumerate(self._active):
+            request.position += 1
+            if self._emit(request, self._sample(request, logits[i:i + 1])):
+                self._finish(request)
+            else:
+                keep.append(i)
+        # Once per step, not per token: every stream in the batch waited this long
+        metrics.TOKENS_GENERATED.inc(batch)
+        metrics.INTER_TOKEN_SECONDS.observe(time.perf_counter() - start, batch)
+
+        if len(keep) < batch:
+            self._evict(keep)
+
+    @torch.no_grad()
+    def _speculative_step(self):
+        """
+        Draft tokens for the single active request and verify them in one forward
+        pass. Returns False (and does nothing) when no draft is available.
+        """
+        request = self._active[0]
+        remaining = request.max_new_tokens - request.generated - 1
+        draft = prompt_lookup_draft(
+            request.token_ids[0], self.speculative_max_ngram, min(self.speculative_tokens, remaining)
+        )
+        if not draft:
+            return False
+
+        tokens = [request.next_token] + draft
+        past_length = self._mask.shape[1]
+        out = self.model(
+            input_ids=torch.tensor([tokens], device=self.device),
+            attention_mask=F.pad(self._mask, (0, len(tokens)), value=1),
+            position_ids=torch.arange(
+                request.position, request.position + len(tokens), device=self.device
+            ).unsqueeze(0),
+            past_key_values=_tensors_to_cache(self._kv),
+            use_cache=True,
+        )
+        logits = out.logits[0]
+
+        accepted = 0
+        for i, draft_token in enumerate(draft):
+            ok, token = verify_draft_token(
+                logits[i:i + 1], draft_token, request.token_ids, request.processors, request.temperature
+            )
+            done = self._emit(request, token)
+            if not ok or done:
+                accepted += ok
+                break
+            accepted += 1
+        else:
+            # Every draft matched: the last position gives one bonus token
+            done = self._emit(request, self._sample(request, logits[-1:]))
+
+        self.draft_tokens += len(draft)
+        self.accepted_draft_tokens += accepted
+        request.position += 1 + accepted
+        if done:
+            self._finish(request)
+            self._evict([])
+            return True
+
+        # Keep cache entries for next_token and the accepted drafts only
+        keep_length = past_length + 1 + accepted
+        self._kv = [(k[:, :, :keep_length], v[:, :, :keep_length]) for k, v in _cache_to_tensors(out.past_key_values)]
+        self._mask = self._mask.new_ones((1, keep_length))
+        return True
+
+    def _evict(self, keep):
+        """
+        Drop finished or cancelled rows from the batch and trim columns that are now pure padding.
+        """
+        self._active = [self._active[i] for i in keep]
+        if not self._active:
+            self._kv, self._mask = None, None
+            return
+        index = torch.tensor(keep, device=self.device)
+        self._kv = [(k.index_select(0, index), v.index_select(0, index)) for k, v in self._kv]
+        self._mask = self._mask.index_select(0, index)
+
+        start = int((self._mask.sum(dim=0) == 0).long().cumprod(dim=0).sum())
+        if start:
+            self._kv = [(k[:, :, start:], v[:, :, start:]) for k, v in self._kv]
+            self._mask = self._mask[:, start:]
@@ -0,0 +1,104 @@
+import os
+import json
+import shutil
+import hashlib
+
+MANIFEST = "snapshot.json"
+
+
+def snapshot_root():
+    return os.getenv("MODEL_SNAPSHOT_DIR", os.path.join("models", "snapshots"))
+
+
+def snapshot_path(name):
+    return os.path.join(snapshot_root(), name)
+
+
+def file_sha256(path):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def _list_files(path):
+    files = []
+    for root, _, names in os.walk(path):
+        for file_name in names:
+            rel = os.path.relpath(os.path.join(root, file_name), path)
+            if rel != MANIFEST:
+                files.append(rel)
+    return sorted(files)
+
+
+def _snapshot_hash(files):
+    # One hash over every file's content hash: identifies the snapshot as a whole
+    return hashlib.sha256(json.dumps(files, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def export(name, model_id, revision, dtype, save):
+    """
+    Write a snapshot with `save(directory)`, hash every file into the manifest
+    and swap it into place, so a half-written export is never picked up.
+    """
+    final_path = snapshot_path(name)
+    tmp_path = f"{final_path}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    save(tmp_path)
+
+    files = {
+        rel: {"size": os.path.getsize(os.path.join(tmp_path, rel)), "sha256": file_sha256(os.path.join(tmp_path, rel))}
+        for rel in _list_files(tmp_path)
+    }
+    manifest = {
+        "model_id": model_id,
+        "revision": revision,
+        "dtype": dtype,
+        "hash": _snapshot_hash(files),
+        "files": files,
+    }
+    with open(os.path.join(tmp_path, MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+    old_path = f"{final_path}.old"
+    if os.path.exists(final_path):
+        os.replace(final_path, old_path)
+    os.replace(tmp_path, final_path)
+    shutil.rmtree(old_path, ignore_errors=True)
+    return manifest
+
+
+def resolve(name, model_id):
+    """
+    Manifest (plus "path") of the local snapshot exported for `model_id`, or
+    None when there is none. File sizes are always checked; MODEL_SNAPSHOT_VERIFY=1
+    re-hashes every file and MODEL_SNAPSHOT_PIN_<NAME> pins the snapshot hash.
+    """
+    path = snapshot_path(name)
+    manifest_path = os.path.join(path, MANIFEST)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get("model_id") != model_id:
+        print(f"Snapshot '{name}' is for {manifest.get('model_id')}, not {model_id}; ignoring it.")
+        return None
+
+    pin = os.getenv(f"MODEL_SNAPSHOT_PIN_{name.upper()}")
+    if pin and not manifest["hash"].startswith(pin):
+        raise RuntimeError(f"Snapshot '{name}' has hash {manifest['hash'][:16]}, pinned to {pin}")
+
+    verify = os.getenv("MODEL_SNAPSHOT_VERIFY", "0") == "1"
+    for rel, expected in manifest["files"].items():
+        file_path = os.path.join(path, rel)
+        if not os.path.exists(file_path) or os.path.getsize(file_path) != expected["size"]:
+            raise RuntimeError(f"Snapshot '{name}' is incomplete: {rel} is missing or has the wrong size")
+        if verify and file_sha256(file_path) != expected["sha256"]:
+            raise RuntimeError(f"Snapshot '{name}' is corrupt: {rel} does not match its hash")
+
+    manifest["path"] = path
+    print(f"Using snapshot '{name}' ({model_id}@{str(manifest.get('revision'))[:12]}, "
+          f"{manifest.get('dtype')}, hash {manifest['hash'][:12]})")
+    return manifest
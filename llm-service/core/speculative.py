@@ -0,0 +1,44 @@
+import torch
+
+
+def prompt_lookup_draft(token_ids, max_ngram=3, num_tokens=10):
+    """
+    Prompt-lookup (n-gram) drafting: find the earliest earlier occurrence of the
+    last n tokens (trying n = max_ngram..1) and propose the tokens that followed
+    it. RAG answers copy spans from the context, so these drafts are often right.
+    Returns a list of up to `num_tokens` token ids (empty if nothing matched).
+    """
+    if num_tokens <= 0:
+        return []
+    length = token_ids.shape[-1]
+    for n in range(max_ngram, 0, -1):
+        if length <= n:
+            continue
+        tail = token_ids[-n:]
+        # All windows except the tail itself
+        windows = token_ids[:-1].unfold(0, n, 1)
+        matches = (windows == tail).all(dim=1).nonzero().flatten()
+        if matches.numel():
+            start = int(matches[0]) + n
+            return token_ids[start:start + num_tokens].tolist()
+    return []
+
+
+def verify_draft_token(logits, draft_token, token_ids, processors, temperature):
+    """
+    Speculative-sampling check of one drafted token against the model's (1 x V)
+    logits. The draft is deterministic, so it is accepted with probability
+    p(draft) and on rejection the replacement is sampled from p with the draft
+    removed; the output distribution is exactly that of normal sampling.
+    Under greedy decoding the draft is accepted only if it is the argmax.
+    Returns (accepted, token).
+    """
+    if not temperature:
+        token = int(logits.argmax(dim=-1))
+        return token == draft_token, token
+
+    probs = torch.softmax(processors(token_ids, logits.float()), dim=-1)
+    if float(torch.rand(())) < float(probs[0, draft_token]):
+        return True, draft_token
+    probs[0, draft_token] = 0
+    return False, int(torch.multinomial(probs / probs.sum(), num_samples=1))
@@ -0,0 +1,92 @@
+import os
+import re
+import asyncio
+import base64
+from collections import deque
+
+# Sentence end: . ! ? (optionally closed by quotes/brackets) once the following
+# whitespace has arrived, or a line break
+_BOUNDARY = re.compile(r'[.!?]["\')\]]*\s+|\n+')
+
+
+class SentenceBuffer:
+    """
+    Incremental sentence splitter for streamed text. Sentences shorter than
+    `min_chars` are held back and merged with the next one, so "Hi." does not
+    become its own TTS request.
+    """
+
+    def __init__(self, min_chars=24):
+        self.min_chars = min_chars
+        self._text = ""
+
+    def feed(self, delta):
+        """
+        Add a text delta and return the sentences it completed.
+        """
+        self._text += delta
+        sentences = []
+        start = 0
+        for match in _BOUNDARY.finditer(self._text):
+            candidate = self._text[start:match.end()].strip()
+            if len(candidate) >= self.min_chars:
+                sentences.append(candidate)
+                start = match.end()
+        self._text = self._text[start:]
+        return sentences
+
+    def flush(self):
+        """
+        Return whatever is left once the text stream has ended.
+        """
+        rest, self._text = self._text.strip(), ""
+        return [rest] if rest else []
+
+
+async def speech_events(text_stream, synthesize, concurrency=None):
+    """
+    Multiplex a token stream with per-sentence speech.
+
+    Yields {"type": "text", "data": delta} for every delta as it arrives and,
+    in sentence order, {"type": "audio", "seq": n, "text": sentence, "data":
+    base64 audio} (or an "audio_error" event) for every sentence. Synthesis of
+    a sentence starts as soon as it is complete, while later tokens are still
+    being generated; at most `concurrency` syntheses run at once.
+    """
+    limit = asyncio.Semaphore(concurrency or int(os.getenv("SPEECH_TTS_CONCURRENCY", "2")))
+    splitter = SentenceBuffer()
+    pending = deque()
+
+    async def run(sentence):
+        async with limit:
+            return await synthesize(sentence)
+
+    def start(sentences):
+        for sentence in sentences:
+            pending.append((len(pending) + emitted, sentence, asyncio.create_task(run(sentence))))
+
+    def event(seq, sentence, task):
+        error = task.exception()
+        if error is not None:
+            return {"type": "audio_error", "seq": seq, "text": sentence, "detail": str(error)}
+        return {"type": "audio", "seq": seq, "text": sentence, "data": base64.b64encode(task.result()).decode("ascii")}
+
+    emitted = 0
+    try:
+        async for delta in text_stream:
+            yield {"type": "text", "data": delta}
+            start(splitter.feed(delta))
+            # Emit finished segments in order without waiting for the rest
+            while pending and pending[0][2].done():
+                yield event(*pending.popleft())
+                emitted += 1
+
+        start(splitter.flush())
+        while pending:
+            await asyncio.wait([pending[0][2]])
+            yield event(*pending.popleft())
+            emitted += 1
+    finally:
+        for _, _, task in pending:
+            task.cancel()
+        await text_stream.aclose()
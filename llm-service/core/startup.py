@@ -0,0 +1,80 @@
+import time
+import asyncio
+import traceback
+
+
+class EngineState:
+    def __init__(self, name):
+        self.name = name
+        self.status = "pending"
+        self.error = None
+        self.started_at = None
+        self.load_seconds = None
+
+    def to_dict(self):
+        elapsed = self.load_seconds
+        if elapsed is None and self.started_at is not None:
+            elapsed = time.time() - self.started_at
+        return {
+            "status": self.status,
+            "load_seconds": round(elapsed, 3) if elapsed is not None else None,
+            "error": self.error,
+        }
+
+
+class EngineLoader:
+    """
+    Loads engines concurrently on background threads so the server binds its
+    port immediately. Each engine goes pending -> loading -> ready | failed;
+    callers can wait() for the engines they depend on.
+    """
+
+    def __init__(self):
+        self.states = {}
+        self._done = {}
+        self._tasks = set()
+
+    def start(self, name, factory):
+        """
+        Run the blocking `factory()` on a worker thread and track its state.
+        """
+        state = self.states[name] = EngineState(name)
+        self._done[name] = asyncio.Event()
+        task = asyncio.create_task(self._load(state, factory))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _load(self, state, factory):
+        state.status = "loading"
+        state.started_at = time.time()
+        try:
+            await asyncio.to_thread(factory)
+            state.status = "ready"
+            print(f"Engine '{state.name}' ready in {time.time() - state.started_at:.1f}s")
+        except Exception as e:
+            state.status = "failed"
+            state.error = f"{type(e).__name__}: {e}"
+            print(f"Engine '{state.name}' failed to load: {state.error}")
+            traceback.print_exc()
+        finally:
+            state.load_seconds = time.time() - state.started_at
+            self._done[state.name].set()
+
+    async def wait(self, *names):
+        """
+        Wait until the named engines finished loading; True if all are ready.
+        """
+        for name in names:
+            await self._done[name].wait()
+        return all(self.states[name].status == "ready" for name in names)
+
+    def status(self, name):
+        state = self.states.get(name)
+        return state.status if state else "pending"
+
+    def report(self):
+        return {name: state.to_dict() for name, state in self.states.items()}
+
+    @property
+    def ready(self):
+        return bool(self.states) and all(state.status == "ready" for state in self.states.values())
@@ -0,0 +1,258 @@
+import os
+import time
+import asyncio
+import hashlib
+import unicodedata
+from uuid import uuid4
+from collections import OrderedDict
+from threading import Lock
+from core.workers import run_cpu
+
+
+class _Fill:
+    """
+    One in-flight synthesis. Chunks are kept as they arrive so any number of
+    requests for the same key can follow the stream from the start.
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self._event = asyncio.Event()
+
+    def push(self, chunk):
+        self.chunks.append(chunk)
+        self._wake()
+
+    def finish(self, error=None):
+        self.error = error
+        self.done = True
+        self._wake()
+
+    def _wake(self):
+        event, self._event = self._event, asyncio.Event()
+        event.set()
+
+    async def follow(self):
+        sent = 0
+        while True:
+            event = self._event
+            while sent < len(self.chunks):
+                yield self.chunks[sent]
+                sent += 1
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            await event.wait()
+
+
+class TTSCache:
+    """
+    Content-addressed cache of encoded TTS audio.
+
+    Keys are sha256 of (engine, voice, normalized text). Audio is written to
+    `cache_dir` with write-then-rename, so several worker processes can share
+    the directory, and evicted least-recently-used first once it grows past
+    `max_bytes` (a hit bumps the file's mtime, so recency is shared too). The
+    directory is recounted on store, so the cap covers every worker's files.
+    Recently synthesized clips also stay in a small in-memory hot tier.
+    Concurrent misses for one key share a single synthesis via start_fill().
+    """
+
+    # Minimum seconds between directory recounts (a full walk) on store
+    SCAN_INTERVAL = 5.0
+
+    def __init__(self, cache_dir=None, max_bytes=None, memory_bytes=None):
+        self.cache_dir = cache_dir or os.getenv("TTS_CACHE_DIR", "tts_cache")
+        self.max_bytes = max_bytes if max_bytes is not None else int(float(os.getenv("TTS_CACHE_MAX_MB", "512")) * 2**20)
+        self.memory_bytes = memory_bytes if memory_bytes is not None else int(float(os.getenv("TTS_CACHE_MEMORY_MB", "32")) * 2**20)
+        self._lock = Lock()
+        self._files = OrderedDict()  # key -> size, oldest first
+        self._disk_bytes = 0
+        self._scanned_at = 0.0
+        self._hot = OrderedDict()  # key -> bytes
+        self._hot_bytes = 0
+        self._pending = {}
+        self._tasks = set()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self._scan()
+
+    @staticmethod
+    def normalize(text):
+        return " ".join(unicodedata.normalize("NFKC", text).split())
+
+    def key(self, engine, voice, text):
+        raw = f"{engine}\0{voice}\0{self.normalize(text)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + ".audio")
+
+    def _scan(self):
+        # Rebuild the LRU order from file mtimes left by earlier runs / other workers
+        entries = []
+        if os.path.isdir(self.cache_dir):
+            for root, _, names in os.walk(self.cache_dir):
+                for name in names:
+                    if name.endswith(".audio"):
+                        try:
+                            stat = os.stat(os.path.join(root, name))
+                        except FileNotFoundError:
+                            # Evicted by another worker mid-walk
+                            continue
+                        entries.append((stat.st_mtime, name[:-len(".audio")], stat.st_size))
+        files = OrderedDict((key, size) for _, key, size in sorted(entries))
+        with self._lock:
+            self._files = files
+            self._disk_bytes = sum(files.values())
+            self._scanned_at = time.monotonic()
+
+    def lookup(self, key):
+        """
+        Return (audio_bytes, None) from the hot tier, (None, path) from disk,
+        or (None, None) on a miss.
+        """
+        with self._lock:
+            data = self._hot.get(key)
+            if data is not None:
+                self._hot.move_to_end(key)
+                self.memory_hits += 1
+                return data, None
+
+        path = self.path(key)
+        try:
+            os.utime(path)
+            size = os.path.getsize(path)
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None, None
+        with self._lock:
+            # May have been written by another worker
+            if key not in self._files:
+                self._disk_bytes += size
+            self._files[key] = size
+            self._files.move_to_end(key)
+            self.disk_hits += 1
+        return None, path
+
+    def read(self, key, path):
+        """
+        Audio of a disk hit from lookup(), or None (counted as a miss) if another
+        worker evicted the file in between.
+        """
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            with self._lock:
+                self.disk_hits -= 1
+                self.misses += 1
+                self._disk_bytes -= self._files.pop(key, 0)
+            return None
+
+    def store(self, key, data):
+        """
+        Write audio atomically, add it to the hot tier and evict past the caps.
+        """
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        if time.monotonic() - self._scanned_at > self.SCAN_INTERVAL:
+            # Other workers write to the same directory: count their files too
+            self._scan()
+
+        stale = []
+        with self._lock:
+            self._disk_bytes += len(data) - self._files.get(key, 0)
+            self._files[key] = len(data)
+            self._files.move_to_end(key)
+            while self._disk_bytes > self.max_bytes and self._files:
+                old_key, size = self._files.popitem(last=False)
+                self._disk_bytes -= size
+                stale.append(old_key)
+
+            self._hot_bytes -= len(self._hot.pop(key, b""))
+            if len(data) <= self.memory_bytes:
+                self._hot[key] = data
+                self._hot_bytes += len(data)
+            for old_key in stale:
+                self._hot_bytes -= len(self._hot.pop(old_key, b""))
+            while self._hot_bytes > self.memory_bytes:
+                _, old = self._hot.popitem(last=False)
+                self._hot_bytes -= len(old)
+            self.evictions += len(stale)
+
+        for old_key in stale:
+            try:
+                os.remove(self.path(old_key))
+            except FileNotFoundError:
+                pass
+
+    def pending(self, key):
+        """
+        The in-flight synthesis for `key`, if any. Following it counts as coalesced.
+        """
+        fill = self._pending.get(key)
+        if fill is not None:
+            self.coalesced += 1
+        return fill
+
+    def start_fill(self, key, audio, on_done=None):
+        """
+        Consume the async chunk iterator `audio` in a background task, store the
+        result and return the _Fill that requests stream from. The task keeps
+        running if the request that started it goes away.
+        """
+        fill = _Fill()
+        self._pending[key] = fill
+        # Hold a reference so the task is not garbage-collected mid-synthesis
+        task = asyncio.create_task(self._run_fill(key, fill, audio, on_done))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return fill
+
+    async def _run_fill(self, key, fill, audio, on_done):
+        try:
+            async for chunk in audio:
+                fill.push(chunk)
+            if fill.chunks:
+                try:
+                    await run_cpu(self.store, key, b"".join(fill.chunks))
+                except OSError as e:
+                    print(f"TTS cache write failed: {e}")
+            fill.finish()
+        except asyncio.CancelledError:
+            fill.finish(RuntimeError("synthesis cancelled"))
+            raise
+        except Exception as e:
+            fill.finish(e)
+        finally:
+            self._pending.pop(key, None)
+            await audio.aclose()
+            if on_done is not None:
+                on_done()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "files": len(self._files),
+                "disk_bytes": self._disk_bytes,
+                "memory_entries": len(self._hot),
+                "memory_bytes": self._hot_bytes,
+                "in_flight": len(self._pending),
+            }
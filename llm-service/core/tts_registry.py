@@ -0,0 +1,58 @@
+import os
+import time
+import importlib
+from threading import Lock
+
+# name -> (module, class). Modules are imported on first use, so a backend's
+# heavy dependencies (torch, zipvoice) are only loaded if it is selected.
+BACKENDS = {
+    "edge": ("core.edge_service", "EdgeTTSEngine"),
+    "luxtts": ("core.zipvoice_service", "LuxTTSEngine"),
+}
+
+
+class TTSRegistry:
+    """
+    Lazily constructed TTS backends. TTS_BACKEND picks the default; requests
+    may name another registered backend, which is then loaded on first use.
+    """
+
+    def __init__(self, default=None):
+        self.default = (default or os.getenv("TTS_BACKEND", "edge")).lower()
+        if self.default not in BACKENDS:
+            raise ValueError(f"Unknown TTS_BACKEND '{self.default}', expected one of {sorted(BACKENDS)}")
+        self._engines = {}
+        self._locks = {name: Lock() for name in BACKENDS}
+        self.startup_seconds = {}
+
+    def names(self):
+        return sorted(BACKENDS)
+
+    def loaded(self, name=None):
+        """
+        The engine if it is already constructed, else None.
+        """
+        return self._engines.get(name or self.default)
+
+    def get(self, name=None):
+        """
+        Return the engine for `name` (default backend if None), constructing it
+        if needed. Raises KeyError for unknown names.
+        """
+        name = (name or self.default).lower()
+        if name not in BACKENDS:
+            raise KeyError(name)
+        engine = self._engines.get(name)
+        if engine is not None:
+            return engine
+        # Per-backend lock: loading LuxTTS does not hold up Edge requests
+        with self._locks[name]:
+            engine = self._engines.get(name)
+            if engine is None:
+                start = time.time()
+                module, cls = BACKENDS[name]
+                engine = getattr(importlib.import_module(module), cls)()
+                self.startup_seconds[name] = round(time.time() - start, 3)
+                print(f"TTS backend '{name}' ready in {self.startup_seconds[name]}s")
+                self._engines[name] = engine
+        return engine
@@ -0,0 +1,120 @@
+import os
+import json
+import numpy as np
+
+
+class NumpyIndex:
+    """
+    Exact in-memory vector index over the knowledge base.
+
+    All embeddings live in one L2-normalized matrix (float32, float16 or int8
+    with per-row scales), so top-k is one matrix-vector product plus
+    argpartition. The matrix is snapshotted to `snapshot_dir` as .npy files and
+    reloaded with mmap, so restarts are instant and several processes share
+    the same pages. Distances are reported on Chroma's squared-L2 scale
+    (2 - 2 * cosine) so callers can treat both backends the same.
+    """
+
+    DTYPES = ("float32", "float16", "int8")
+    BLOCK_ROWS = 65536
+
+    def __init__(self, snapshot_dir, dtype=None):
+        self.snapshot_dir = snapshot_dir
+        self.dtype = (dtype or os.getenv("VECTOR_INDEX_DTYPE", "float32")).lower()
+        if self.dtype not in self.DTYPES:
+            raise ValueError(f"Unknown VECTOR_INDEX_DTYPE '{self.dtype}', expected one of {self.DTYPES}")
+        # (matrix, scales, documents, metadatas), swapped as one unit on reload
+        self._data = (None, None, [], [])
+        # Identifies the collection contents the snapshot was built from
+        self.fingerprint = None
+
+    def __len__(self):
+        return len(self._data[2])
+
+    def _path(self, name):
+        return os.path.join(self.snapshot_dir, name)
+
+    def build(self, embeddings, documents, metadatas, fingerprint=None):
+        """
+        Normalize (and optionally quantize) embeddings, write a snapshot and mmap it.
+        `fingerprint` is stored with it so a later load can tell if it is stale.
+        """
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        # An empty collection still gets a well-formed 2-D matrix
+        matrix = matrix.reshape(len(documents), -1) if len(documents) else matrix.reshape(0, 0)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix = matrix / np.where(norms == 0, 1, norms)
+
+        scales = None
+        if self.dtype == "int8":
+            scales = np.abs(matrix).max(axis=1, initial=0) / 127
+            scales[scales == 0] = 1
+            matrix = np.round(matrix / scales[:, None]).astype(np.int8)
+        elif self.dtype == "float16":
+            matrix = matrix.astype(np.float16)
+
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        self._save("index.npy", matrix)
+        if scales is not None:
+            self._save("scales.npy", scales.astype(np.float32))
+        meta = {"dtype": self.dtype, "fingerprint": fingerprint, "documents": list(documents), "metadatas": [m or {} for m in metadatas]}
+        tmp_path = self._path("meta.json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self._path("meta.json"))
+        return self.load()
+
+    def _save(self, name, array):
+        # Write then rename so readers never mmap a half-written file
+        tmp_path = self._path(name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            np.save(f, array)
+        os.replace(tmp_path, self._path(name))
+
+    def load(self):
+        """
+        Memory-map an existing snapshot. Returns False if there is none for this dtype.
+        """
+        meta_path = self._path("meta.json")
+        if not os.path.exists(meta_path):
+            return False
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("dtype") != self.dtype:
+            return False
+        matrix = np.load(self._path("index.npy"), mmap_mode="r")
+        scales = np.load(self._path("scales.npy"), mmap_mode="r") if self.dtype == "int8" else None
+        self._data = (matrix, scales, meta["documents"], meta["metadatas"])
+        self.fingerprint = meta.get("fingerprint")
+        return True
+
+    def query(self, query_embedding, n_results=1):
+        """
+        Return the top-k hits as dicts with document, metadata and distance.
+        """
+        matrix, scales, documents, metadatas = self._data
+        if matrix is None or not documents:
+            return []
+        query = np.asarray(query_embedding, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+
+        if matrix.dtype == np.float32:
+            scores = matrix @ query
+        else:
+            # Upcast quantized rows in blocks to keep temporary memory bounded
+            scores = np.empty(len(documents), dtype=np.float32)
+            for start in range(0, len(documents), self.BLOCK_ROWS):
+                block = matrix[start:start + self.BLOCK_ROWS]
+                scores[start:start + len(block)] = block.astype(np.float32) @ query
+        if scales is not None:
+            scores = scores * scales
+
+        k = min(n_results, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            {"document": documents[i], "metadata": metadatas[i], "distance": float(2 - 2 * scores[i])}
+            for i in top
+        ]
@@ -0,0 +1,18 @@
+import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+# Bounded pool for CPU-bound work (embedding, vector queries, tokenization)
+# so it never runs on the event loop thread.
+cpu_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("CPU_WORKERS", "4")),
+    thread_name_prefix="cpu-worker"
+)
+
+
+async def run_cpu(fn, *args, **kwargs):
+    """
+    Run a blocking function on the shared CPU executor and await its result.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(cpu_executor, lambda: fn(*args, **kwargs))
@@ -2,61 +2,170 @@ import os
 import torch
 import torchaudio
 import io
+import asyncio
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 from zipvoice.luxvoice import LuxTTS
+from core.audio_encoding import AudioEncoder
+from core.chunking import split_sentences
 
 class LuxTTSEngine:
+    name = "luxtts"
+
+    MODEL_ID = 'YatharthS/LuxTTS'
+    PROMPT_RMS = 0.01
+    SAMPLE_RATE = 48000
+
     def __init__(self):
         print("Initializing LuxTTS Engine...")
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
         print(f"Using device: {self.device}")
-        
+
         try:
-            self.model = LuxTTS('YatharthS/LuxTTS', device=self.device)
+            self.model = LuxTTS(self.MODEL_ID, device=self.device)
             print("LuxTTS Model Loaded.")
         except Exception as e:
             print(f"Error loading LuxTTS: {e}")
             raise e
 
+        # One dedicated thread: synthesis never blocks the event loop or the shared CPU pool
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="luxtts")
+
+        # TTS_AUDIO_FORMAT=wav keeps the single uncompressed WAV per request;
+        # mp3 / opus are encoded incrementally while later sentences synthesize
+        self.audio_format = os.getenv("TTS_AUDIO_FORMAT", "mp3").lower()
+        self.encoder = None if self.audio_format == "wav" else AudioEncoder(self.audio_format)
+        self.media_type = "audio/wav" if self.encoder is None else self.encoder.media_type
+
         # Load Prompt
-        self.prompt_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "male_voice.wav")
+        self.prompt_path = os.getenv("LUXTTS_PROMPT") or os.path.join(
+            os.path.dirname(os.path.dirname(__file__)), "male_voice.wav"
+        )
+        self.prompt_cache_dir = os.getenv("LUXTTS_PROMPT_CACHE", "tts_prompt_cache")
         self.encoded_prompt = None
-        
+        self.voice = None
+
         if not os.path.exists(self.prompt_path):
             print(f"Warning: Prompt file not found at {self.prompt_path}")
         else:
-            print(f"Encoding prompt audio from {self.prompt_path}...")
             try:
-                # encode_prompt might take time
-                self.encoded_prompt = self.model.encode_prompt(self.prompt_path, rms=0.01)
-                print("Prompt encoded successfully.")
+                self.encoded_prompt = self._load_prompt()
             except Exception as e:
                 print(f"Error encoding prompt: {e}")
 
+    def _load_prompt(self):
+        """
+        Encode the voice prompt once per audio file and reuse it across restarts.
+        The cache file is keyed by the audio content, model and encode settings.
+        """
+        sha = hashlib.sha256()
+        with open(self.prompt_path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                sha.update(block)
+        sha.update(f"{self.MODEL_ID}:{self.PROMPT_RMS}".encode("utf-8"))
+        # The prompt hash (plus output encoding) is the voice id for the TTS cache
+        self.voice = sha.hexdigest()[:16]
+        if self.encoder is not None:
+            self.voice += f":{self.encoder.format}:{self.encoder.bitrate}:{self.encoder.sample_rate}"
+        cache_path = os.path.join(self.prompt_cache_dir, f"{sha.hexdigest()}.pt")
+
+        if os.path.exists(cache_path):
+            # Written by us, not downloaded: full unpickling is fine here
+            prompt = torch.load(cache_path, map_location=self.device, weights_only=False)
+            print(f"Loaded encoded prompt from {cache_path}")
+            return prompt
+
+        print(f"Encoding prompt audio from {self.prompt_path}...")
+        with torch.inference_mode():
+            prompt = self.model.encode_prompt(self.prompt_path, rms=self.PROMPT_RMS)
+        os.makedirs(self.prompt_cache_dir, exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        torch.save(prompt, tmp_path)
+        os.replace(tmp_path, cache_path)
+        print("Prompt encoded successfully.")
+        return prompt
+
+    def _synthesize(self, text):
+        with torch.inference_mode():
+            # Generate speech (returns tensor)
+            # Default sample rate for LuxTTS is 48000
+            audio = self.model.generate_speech(text, self.encoded_prompt, num_steps=4)
+
+        # Convert to Bytes
+        buffer = io.BytesIO()
+        # Audio is likely (1, T) or (T,). Torchaudio expects (C, T)
+        if audio.dim() == 1:
+            audio = audio.unsqueeze(0)
+
+        # Ensure CPU for saving
+        audio = audio.cpu()
+
+        torchaudio.save(buffer, audio, self.SAMPLE_RATE, format="wav")
+        return buffer.getvalue()
+
+    def _synthesize_pcm(self, text):
+        with torch.inference_mode():
+            audio = self.model.generate_speech(text, self.encoded_prompt, num_steps=4)
+        return audio.reshape(-1).float().cpu().numpy()
+
+    async def synthesize_pcm(self, text):
+        """
+        Float32 mono waveform (48 kHz) for one text, on the LuxTTS worker thread.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._synthesize_pcm, text)
+
+    async def _pcm_stream(self, text):
+        """
+        PCM of `text` sentence by sentence. generate_speech takes one text at a
+        time, so each sentence is yielded as soon as it is synthesized while the
+        next one is already being synthesized.
+        """
+        sentences = split_sentences(" ".join(text.split())) or [text]
+        pending = asyncio.ensure_future(self.synthesize_pcm(sentences[0]))
+        try:
+            for i in range(len(sentences)):
+                wave = await pending
+                if i + 1 < len(sentences):
+                    pending = asyncio.ensure_future(self.synthesize_pcm(sentences[i + 1]))
+                yield wave.tobytes()
+        finally:
+            pending.cancel()
+
+    async def stream_async(self, text):
+        """
+        Same interface as EdgeTTSEngine.stream_async. With TTS_AUDIO_FORMAT=wav
+        the whole clip is one WAV chunk; otherwise compressed audio is streamed
+        as ffmpeg encodes it.
+        """
+        if self.encoded_prompt is None:
+            raise RuntimeError("Cannot generate: Encoded prompt is None")
+        if self.encoder is None:
+            loop = asyncio.get_running_loop()
+            yield await loop.run_in_executor(self._executor, self._synthesize, text)
+            return
+        async for data in self.encoder.encode(self._pcm_stream(text), self.SAMPLE_RATE):
+            yield data
+
     def generate(self, text):
         if self.encoded_prompt is None:
             print("Cannot generate: Encoded prompt is None")
             return None
-        
+
         try:
             print(f"Generating TTS for: {text[:50]}...")
-            # Generate speech (returns tensor)
-            # Default sample rate for LuxTTS is 48000
-            audio = self.model.generate_speech(text, self.encoded_prompt, num_steps=4)
-            
-            # Convert to Bytes
-            buffer = io.BytesIO()
-            # Audio is likely (1, T) or (T,). Torchaudio expects (C, T)
-            if audio.dim() == 1:
-                audio = audio.unsqueeze(0)
-            
-            # Ensure CPU for saving
-            audio = audio.cpu()
-            
-            torchaudio.save(buffer, audio, 48000, format="wav")
-            buffer.seek(0)
-            return buffer
+            return io.BytesIO(self._executor.submit(self._synthesize, text).result())
         except Exception as e:
             print(f"Generation error: {e}")
             import traceback
             traceback.print_exc()
             return None
+
+    async def warmup(self):
+        print("Warming up LuxTTS engine...")
+        try:
+            async for _ in self.stream_async("ok"):
+                pass
+            print("LuxTTS Engine warmed up.")
+        except Exception as e:
+            print(f"TTS Warmup failed: {e}")
@@ -0,0 +1,81 @@
+import os
+import sys
+import time
+from dotenv import load_dotenv
+
+# Resolve absolute path to .env and make 'core' importable
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(BASE_DIR)
+load_dotenv(os.path.join(BASE_DIR, ".env"))
+
+from huggingface_hub import HfApi
+from core import snapshots
+
+# Usage: python export_models.py [llm] [embedder] [--revision=<branch|tag|commit>]
+# Run once with network access (e.g. `docker compose run backend python export_models.py`);
+# the server then loads both models offline from MODEL_SNAPSHOT_DIR.
+
+
+def export_llm(revision):
+    from transformers import AutoModelForCausalLM, AutoTokenizer
+    from core.llm import MODEL_ID, PROFILE_DTYPES
+
+    profile = os.getenv("LLM_PROFILE", "auto").lower()
+    # Pin the export to the exact hub commit the revision points at right now
+    commit = HfApi().model_info(MODEL_ID, revision=revision).sha
+    tokenizer = AutoTokenizer.from_pretrained(MODEL_ID, revision=commit)
+    # Stored in the serving dtype, so startup maps the weights without a conversion copy
+    model = AutoModelForCausalLM.from_pretrained(MODEL_ID, revision=commit, torch_dtype=PROFILE_DTYPES[profile])
+
+    def save(path):
+        model.save_pretrained(path)
+        tokenizer.save_pretrained(path)
+
+    dtype = str(model.dtype).replace("torch.", "")
+    return snapshots.export("llm", MODEL_ID, commit, dtype, save)
+
+
+def export_embedder(revision):
+    from sentence_transformers import SentenceTransformer
+    from core.rag import EMBED_MODEL_ID
+
+    commit = HfApi().model_info(EMBED_MODEL_ID, revision=revision).sha
+    model = SentenceTransformer(EMBED_MODEL_ID, revision=commit)
+
+    def save(path):
+        model.save(path, safe_serialization=True)
+
+    dtype = str(next(model.parameters()).dtype).replace("torch.", "")
+    return snapshots.export("embedder", EMBED_MODEL_ID, commit, dtype, save)
+
+
+EXPORTERS = {"llm": export_llm, "embedder": export_embedder}
+
+
+def main():
+    revision = "main"
+    names = []
+    for arg in sys.argv[1:]:
+        if arg.startswith("--revision="):
+            revision = arg.split("=", 1)[1]
+        else:
+            names.append(arg)
+    names = names or list(EXPORTERS)
+
+    for name in names:
+        if name not in EXPORTERS:
+            print(f"Unknown model '{name}', expected one of {list(EXPORTERS)}")
+            sys.exit(1)
+        print(f"Exporting {name} ({revision})...")
+        start = time.time()
+        manifest = EXPORTERS[name](revision)
+        size_mb = sum(f["size"] for f in manifest["files"].values()) / (1024 * 1024)
+        print(
+            f"SUCCESS: {name} -> {snapshots.snapshot_path(name)} "
+            f"({manifest['model_id']}@{manifest['revision'][:12]}, {manifest['dtype']}, {size_mb:.0f} MB, "
+            f"hash {manifest['hash'][:16]}) in {time.time() - start:.1f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
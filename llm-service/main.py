@@ -1,12 +1,26 @@
-from fastapi import FastAPI, HTTPException
+from dotenv import load_dotenv
+
+# Before any module-level config below reads the environment
+load_dotenv()
+
+from fastapi import FastAPI, HTTPException, Request
 from pydantic import BaseModel
-from fastapi.responses import StreamingResponse
-from core.llm import LLMEngine
-from core.rag import RAGEngine
-from core.edge_service import EdgeTTSEngine
+from typing import Optional
+from functools import partial
+from fastapi.responses import StreamingResponse, JSONResponse, Response
+from starlette.background import BackgroundTask
+from core.tts_registry import TTSRegistry
+from core.response_cache import ResponseCache, replay_stream
+from core.admission import AdmissionController, AdmissionRejected
+from core.context import ContextPacker
+from core.tts_cache import TTSCache
+from core.speech import speech_events
+from core.workers import run_cpu
+from core.startup import EngineLoader
+from core import metrics
 
-import uvicorn
-import threading
+import os
+import json
 import asyncio
 
 from fastapi.middleware.cors import CORSMiddleware
@@ -21,110 +35,505 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Global instances
+# Global instances (set by the background loaders once each engine is ready)
+engines = EngineLoader()
 llm_engine = None
 rag_engine = None
 tts_engine = None
+tts_registry = TTSRegistry()
+context_packer = None
+response_cache = ResponseCache()
+tts_cache = TTSCache()
+
+# Per-engine admission control: max in flight, bounded wait queue, wait deadline (s)
+llm_admission = AdmissionController.from_env("llm", max_in_flight=32, max_queue=64, timeout=10)
+tts_admission = AdmissionController.from_env("tts", max_in_flight=8, max_queue=32, timeout=10)
+
+# Curated CSV answers closer than this (Chroma L2 distance) are returned verbatim
+QA_DIRECT_MAX_DISTANCE = float(os.getenv("QA_DIRECT_MAX_DISTANCE", "0.3"))
+
+# Static part of the /chat system prompt. The retrieved context is appended
+# after it, so its KV cache is computed once at startup and reused.
+SYSTEM_RULES = (
+    "You are Dextora, an advanced AI mentorship platform designed for students, teachers, and schools. "
+    "Your goal is to provide personalized guidance, smart study strategies, and 24/7 support. "
+    "Adhere to the following rules strictly:\n"
+    "1. Answer ONLY using the provided Context. Do NOT use outside knowledge.\n"
+    "2. If the user asks 'Who are you?' or 'What is your name?', reply exactly: "
+    "'My name is Dextora.' followed by a brief 1-sentence summary of what Dextora is (from the context).\n"
+    "If someone asks 'What is Dextora AI', clarify that you are simply 'Dextora' now, but answer the question about your capabilities.\n"
+    "3. If the user greets you (Bi, Hi, Hello, Good Morning, etc.), respond politely and professionally as Dextora, then ask how you can help.\n"
+    "4. If the answer is not in the Context, politely say: 'I can only provide information about Dextora and its dataset. I do not have information on that topic.'\n"
+    "5. Keep responses concise, smart, and professional.\n"
+    "\n\nContext:\n"
+)
 
 class ChatRequest(BaseModel):
     message: str
 
+class TTSRequest(BaseModel):
+    message: str
+    backend: Optional[str] = None
+
+class SpeechRequest(ChatRequest):
+    tts_backend: Optional[str] = None
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(request: Request, exc: AdmissionRejected):
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": f"{exc.engine} overloaded: {exc.reason}"},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
 @app.on_event("startup")
 async def startup_event():
     print("--- STARTING UP: CORS SHOULD BE ACTIVE ---")
-    global llm_engine, rag_engine, tts_engine
-    # Initialize engines
-    try:
-        llm_engine = LLMEngine()
-        rag_engine = RAGEngine()
-        tts_engine = EdgeTTSEngine()
-        print(f"Engines initialized successfully. llm={llm_engine}, rag={rag_engine}")
-        
+    # Engines load concurrently in the background; the port is bound right away
+    # and each endpoint works as soon as the engines it needs are ready (see /ready)
+    engines.start("llm", load_llm)
+    engines.start("rag", load_rag)
+    engines.start("tts", load_tts)
+    asyncio.create_task(after_startup())
+
+# Filled by preload_models() in the pre-fork parent when WEB_WORKERS > 1
+preloaded = {}
+
+def preload_models():
+    """
+    Load the model weights once, before forking, so workers share them.
+    """
+    from core.llm import LLMEngine
+    from core.rag import load_embedder, load_vector_index
+    for name, load in (
+        ("llm", lambda: LLMEngine(start=False)),
+        ("embedder", load_embedder),
+        ("index", load_vector_index),
+        ("tts", tts_registry.get),
+    ):
+        try:
+            preloaded[name] = load()
+        except Exception as e:
+            # The worker loaders retry and report the failure through /ready
+            print(f"Preload of {name} failed: {e}")
+
+def load_llm():
+    global llm_engine, context_packer
+    # Deferred: torch/transformers are only imported on the loader thread
+    from core.llm import LLMEngine
+    engine = preloaded.get("llm") or LLMEngine(start=False)
+    engine.start()
+    # Prefill the static rules block once so requests start from its KV cache
+    engine.warm_prefix(SYSTEM_RULES)
+    # Context is budgeted in the LLM's own tokens
+    context_packer = ContextPacker(engine.tokenizer)
+    llm_engine = engine
+
+def load_rag():
+    global rag_engine
+    from core.rag import RAGEngine
+    rag_engine = RAGEngine(embedder=preloaded.get("embedder"), index=preloaded.get("index"))
+
+def load_tts():
+    global tts_engine
+    tts_engine = tts_registry.get()
+
+async def after_startup():
+    if await engines.wait("tts"):
         # Pre-warm TTS to avoid first-request latency
         asyncio.create_task(tts_engine.warmup())
-        
-    except Exception as e:
-        print(f"Error initializing engines: {e}")
+
+    # TTS_CACHE_PREWARM=1: synthesize the CSV answers into the TTS cache after each ingestion
+    if os.getenv("TTS_CACHE_PREWARM", "0") == "1" and await engines.wait("rag", "tts"):
+        loop = asyncio.get_running_loop()
+        rag_engine.ingestion_listeners.append(
+            lambda: asyncio.run_coroutine_threadsafe(prewarm_tts_cache(), loop)
+        )
+        asyncio.create_task(prewarm_tts_cache())
+
+    await engines.wait(*engines.states)
+    failed = {name: state["error"] for name, state in engines.report().items() if state["status"] == "failed"}
+    if failed:
         with open("startup_failure.txt", "w") as f:
-            f.write(str(e))
+            f.write(json.dumps(failed))
+
+def require(*names):
+    """
+    503 unless the named engines are loaded; Retry-After while still loading.
+    """
+    loaded = {"llm": llm_engine, "rag": rag_engine, "tts": tts_engine}
+    missing = [name for name in names if loaded[name] is None]
+    if not missing:
+        return
+    statuses = {name: engines.status(name) for name in missing}
+    detail = "Engines not ready: " + ", ".join(f"{name} ({status})" for name, status in statuses.items())
+    headers = {"Retry-After": "5"} if "failed" not in statuses.values() else None
+    raise HTTPException(status_code=503, detail=detail, headers=headers)
+
+@app.get("/ready")
+async def ready():
+    """
+    Per-engine load status; 200 once every engine is ready, 503 before that.
+    """
+    body = {"ready": engines.ready, "engines": engines.report()}
+    return JSONResponse(status_code=200 if engines.ready else 503, content=body)
 
 @app.post("/rag/ingest")
 async def ingest_data():
-    if not rag_engine:
-        raise HTTPException(status_code=503, detail="RAG Engine not initialized")
+    require("rag")
     
-    # Run in background thread to not block
-    thread = threading.Thread(target=rag_engine.ingest_data)
-    thread.start()
-    return {"status": "Ingestion started in background"}
+    # Runs in a background thread; a second call while one is running gets the same job
+    job, started = rag_engine.start_ingest_job()
+    message = "Ingestion started in background" if started else "Ingestion already running"
+    return {"message": message, **job.to_dict()}
+
+@app.get("/rag/ingest/{job_id}")
+async def ingest_status(job_id: str):
+    require("rag")
+    job = rag_engine.get_ingest_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Unknown ingestion job")
+    return job.to_dict()
 
 @app.post("/tts")
-async def tts_endpoint(request: ChatRequest):
-    if not tts_engine:
-         raise HTTPException(status_code=503, detail="TTS Engine not initialized")
-    
-    # await the async generator
-    audio_buffer = await tts_engine.generate_async(request.message)
-    if not audio_buffer:
+async def tts_endpoint(request: TTSRequest):
+    engine = await resolve_tts(request.backend)
+
+    # Repeated sentences are served from the TTS cache without synthesis
+    key = tts_cache.key(engine.name, engine.voice, request.message)
+    data, path = tts_cache.lookup(key)
+    if data is None and path is not None:
+        # None if another worker evicted the file meanwhile: synthesize it again
+        data = await run_cpu(tts_cache.read, key, path)
+    if data is not None:
+        return Response(data, media_type=engine.media_type)
+
+    audio = (await tts_fill(engine, key, request.message)).follow()
+    try:
+        # Wait for the first chunk so a failure before any audio is still a 500
+        first_chunk = await anext(audio)
+    except (StopAsyncIteration, Exception) as e:
+        await audio.aclose()
+        print(f"TTS Error ({engine.name}): {e!r}")
         raise HTTPException(status_code=500, detail="Generation failed")
-        
-    return StreamingResponse(audio_buffer, media_type="audio/mp3")
+
+    return StreamingResponse(audio_stream(first_chunk, audio), media_type=engine.media_type)
+
+async def resolve_tts(name=None):
+    """
+    The TTS engine for a request: the default one, or a named backend that is
+    loaded on first use.
+    """
+    if name is None:
+        require("tts")
+        return tts_engine
+    engine = tts_registry.loaded(name)
+    if engine is not None:
+        return engine
+    try:
+        return await run_cpu(tts_registry.get, name)
+    except KeyError:
+        raise HTTPException(status_code=400, detail=f"Unknown TTS backend '{name}', expected one of {tts_registry.names()}")
+    except Exception as e:
+        print(f"Error loading TTS backend '{name}': {e}")
+        raise HTTPException(status_code=503, detail=f"TTS backend '{name}' unavailable")
+
+async def tts_fill(engine, key, text):
+    """
+    The synthesis of `text` to stream from: a running one for the same key
+    (coalesced miss) or a new one under TTS admission control.
+    """
+    fill = tts_cache.pending(key)
+    if fill is None:
+        # The ticket is held until synthesis ends, even if this client leaves early
+        ticket = await tts_admission.acquire()
+        fill = tts_cache.pending(key)
+        if fill is None:
+            fill = tts_cache.start_fill(key, timed_synthesis(engine, text), on_done=ticket.release)
+        else:
+            ticket.release()
+    return fill
+
+async def timed_synthesis(engine, text):
+    """
+    engine.stream_async(text), recording the synthesis time and failures.
+    """
+    import time
+    start = time.perf_counter()
+    audio = engine.stream_async(text)
+    try:
+        async for chunk in audio:
+            yield chunk
+    except Exception:
+        metrics.ERRORS.labels("tts").inc()
+        raise
+    finally:
+        await audio.aclose()
+    metrics.TTS_SYNTHESIS_SECONDS.labels(engine.name).observe(time.perf_counter() - start)
+
+async def synthesize_sentence(engine, text):
+    """
+    Complete audio clip for one sentence, through the TTS cache.
+    """
+    key = tts_cache.key(engine.name, engine.voice, text)
+    data, path = tts_cache.lookup(key)
+    if data is None and path is not None:
+        data = await run_cpu(tts_cache.read, key, path)
+    if data is None:
+        data = b"".join([chunk async for chunk in (await tts_fill(engine, key, text)).follow()])
+    if not data:
+        raise RuntimeError("Generation failed")
+    return data
+
+async def prewarm_tts_cache():
+    """
+    Synthesize every Q&A answer that is not cached yet, one at a time.
+    """
+    answers = await run_cpu(rag_engine.qa_answers)
+    synthesized = 0
+    for answer in answers:
+        key = tts_cache.key(tts_engine.name, tts_engine.voice, answer)
+        if tts_cache.lookup(key) != (None, None):
+            continue
+        fill = tts_cache.pending(key) or tts_cache.start_fill(key, timed_synthesis(tts_engine, answer))
+        try:
+            async for _ in fill.follow():
+                pass
+            synthesized += 1
+        except Exception as e:
+            print(f"TTS pre-warm failed for one answer: {e}")
+    print(f"TTS cache pre-warm done: {synthesized} of {len(answers)} answers synthesized.")
+
+async def audio_stream(first_chunk, audio):
+    """
+    Send MP3 chunks as they are synthesized. A failure after the first chunk
+    cannot change the status code any more, so it is logged and the stream ends.
+    """
+    try:
+        yield first_chunk
+        async for chunk in audio:
+            yield chunk
+    except Exception as e:
+        print(f"TTS stream failed mid-way: {e}")
+    finally:
+        await audio.aclose()
 
 @app.post("/chat")
-async def chat(request: ChatRequest):
-    print(f"Chat Endpoint: llm_engine={llm_engine}, rag_engine={rag_engine}")
-    if not llm_engine or not rag_engine:
-        print("Chat Endpoint: Services are NONE.")
-        raise HTTPException(status_code=503, detail="Services not initialized")
-    
+async def chat(request: ChatRequest, http_request: Request):
+    # Cached and curated answers only need RAG; the LLM is required further down
+    require("rag")
+
+    text_stream, background = await answer_stream(request, http_request)
+    return StreamingResponse(text_stream, media_type="text/event-stream", background=background)
+
+async def answer_stream(request, http_request):
+    """
+    Answer a chat message from the response cache, a curated Q&A pair or the LLM.
+    Returns (text chunk iterator, background task to run after streaming).
+    Only the LLM path goes through admission control; its ticket is released
+    when generation ends.
+    """
     import time
     start_time = time.time()
     user_query = request.message
     print(f"Received query: {user_query}")
+
+    # Another worker (or ingest_standalone.py) may have ingested since: reload
+    # first, so neither retrieval nor the response cache serves the old data
+    if rag_engine.is_stale():
+        await run_cpu(rag_engine.sync)
     
-    # 1. Retrieve Context
+    # 1. Check the semantic response cache, then retrieve context
     t0 = time.time()
-    context_chunks = rag_engine.retrieve(user_query)
+
+    # Lexical fast path: a decisive keyword match on a curated Q&A pair is
+    # answered before the query is even embedded
+    lexical_hits = rag_engine.lexical_lookup(user_query) if rag_engine.lexical_fast_path else None
+    direct_answer = rag_engine.qa_answer(lexical_hits[0]) if lexical_hits else None
+    if direct_answer:
+        print(f"Chat path: lexical (bm25 score={lexical_hits[0]['score']:.2f})")
+        metrics.CHAT_FIRST_CHUNK_SECONDS.labels("lexical").observe(time.time() - start_time)
+        return replay_stream(direct_answer), None
+
+    query_embedding = await rag_engine.embed_query_async(user_query)
+    cached_answer = response_cache.lookup(query_embedding, rag_engine.kb_version)
+    if cached_answer is not None:
+        print(f"Chat path: cache. Lookup took: {time.time() - t0:.3f}s")
+        metrics.CHAT_FIRST_CHUNK_SECONDS.labels("cache").observe(time.time() - start_time)
+        return replay_stream(cached_answer), None
+
+    # Until the LLM is loaded only the top hit matters (direct answers)
+    top_k = context_packer.top_k if context_packer else 1
+    hits = await rag_engine.retrieve_async(user_query, n_results=top_k, query_embedding=query_embedding)
     t1 = time.time()
     print(f"RAG Retrieval took: {t1 - t0:.2f}s")
-    
-    context_text = "\n\n".join(context_chunks)
-    
+
+    # Fast path: a curated Q&A pair matched closely enough to answer verbatim
+    if hits and hits[0]["distance"] is not None and hits[0]["distance"] <= QA_DIRECT_MAX_DISTANCE:
+        direct_answer = rag_engine.qa_answer(hits[0])
+        if direct_answer:
+            print(f"Chat path: direct (qa distance={hits[0]['distance']:.3f})")
+            metrics.CHAT_FIRST_CHUNK_SECONDS.labels("direct").observe(time.time() - start_time)
+            return replay_stream(direct_answer), None
+
+    require("llm")
+    ticket = await llm_admission.acquire()
+    try:
+        # Top-k hits, deduplicated and trimmed at sentence boundaries to the token budget
+        t_pack = time.time()
+        context_text, context_tokens = await run_cpu(context_packer.pack, hits)
+        metrics.CONTEXT_PACK_SECONDS.observe(time.time() - t_pack)
+    except BaseException:
+        ticket.release()
+        raise
+    print(f"Context: {context_tokens} tokens from {len(hits)} hits (budget {context_packer.token_budget})")
+
     # 2. Construct Prompt
-    system_prompt = (
-        "You are Dextora, an advanced AI mentorship platform designed for students, teachers, and schools. "
-        "Your goal is to provide personalized guidance, smart study strategies, and 24/7 support. "
-        "Adhere to the following rules strictly:\n"
-        "1. Answer ONLY using the provided Context. Do NOT use outside knowledge.\n"
-        "2. If the user asks 'Who are you?' or 'What is your name?', reply exactly: "
-        "'My name is Dextora.' followed by a brief 1-sentence summary of what Dextora is (from the context).\n"
-        "If someone asks 'What is Dextora AI', clarify that you are simply 'Dextora' now, but answer the question about your capabilities.\n"
-        "3. If the user greets you (Bi, Hi, Hello, Good Morning, etc.), respond politely and professionally as Dextora, then ask how you can help.\n"
-        "4. If the answer is not in the Context, politely say: 'I can only provide information about Dextora and its dataset. I do not have information on that topic.'\n"
-        "5. Keep responses concise, smart, and professional.\n"
-        "\n\nContext:\n" + context_text
-    )
+    system_prompt = SYSTEM_RULES + context_text
     
     messages = [
         {"role": "system", "content": system_prompt},
         {"role": "user", "content": user_query}
     ]
 
-    print(f"Prompt constructed. Starting LLM stream...")
+    print(f"Chat path: llm. Prompt constructed. Starting LLM stream...")
     
     # 3. Stream Response
     # measure time to first byte inside the generator or just log start here
     t2 = time.time()
     print(f"Pre-stream setup took: {t2 - start_time:.2f}s")
     
-    return StreamingResponse(llm_engine.stream_chat(messages), media_type="text/event-stream")
+    return (
+        cache_stream(llm_engine.stream_chat_async(messages), query_embedding, rag_engine.kb_version, http_request, ticket, start_time),
+        BackgroundTask(ticket.release)
+    )
+
+@app.post("/chat/speech")
+async def chat_speech(request: SpeechRequest, http_request: Request):
+    """
+    /chat with speech: one NDJSON stream of text deltas and, in order, the
+    MP3 of each sentence, synthesized while later tokens are still generated.
+    """
+    require("rag")
+    engine = await resolve_tts(request.tts_backend)
+
+    text_stream, background = await answer_stream(request, http_request)
+    events = speech_events(iterate_async(text_stream), partial(synthesize_sentence, engine))
+    return StreamingResponse(ndjson_stream(events), media_type="application/x-ndjson", background=background)
+
+async def iterate_async(chunks):
+    try:
+        if hasattr(chunks, "__aiter__"):
+            async for chunk in chunks:
+                yield chunk
+        else:
+            for chunk in chunks:
+                yield chunk
+    finally:
+        # Closing the LLM stream cancels generation and releases its ticket
+        if hasattr(chunks, "aclose"):
+            await chunks.aclose()
+
+async def ndjson_stream(events):
+    try:
+        async for event in events:
+            yield json.dumps(event) + "\n"
+    finally:
+        await events.aclose()
+
+async def cache_stream(token_stream, query_embedding, kb_version, http_request, ticket, request_start):
+    """
+    Pass tokens through to the client and store the full answer once it completes.
+    Stops generation as soon as the client disconnects.
+    """
+    import time
+    start_time = time.time()
+    parts = []
+    try:
+        async for text in token_stream:
+            if await http_request.is_disconnected():
+                print(f"Client disconnected after {len(parts)} chunks. Cancelling generation.")
+                return
+            if not parts:
+                metrics.CHAT_FIRST_CHUNK_SECONDS.labels("llm").observe(time.time() - request_start)
+            parts.append(text)
+            yield text
+    finally:
+        # Closing the token stream cancels the scheduler request if still running
+        await token_stream.aclose()
+        ticket.release()
+
+    answer = "".join(parts)
+    if answer and "Error generating response" not in answer:
+        response_cache.store(query_embedding, answer, time.time() - start_time, kb_version)
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return response_cache.stats()
+
+@app.get("/tts/cache/stats")
+async def tts_cache_stats():
+    return tts_cache.stats()
+
+@app.get("/llm/stats")
+async def llm_stats():
+    require("llm")
+    return llm_engine.scheduler.stats()
+
+@app.get("/admission/stats")
+async def admission_stats():
+    return {
+        "llm": llm_admission.stats(),
+        "tts": tts_admission.stats(),
+    }
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """
+    Prometheus text format: stage latency histograms, counters and queue gauges.
+    """
+    return Response(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@metrics.REGISTRY.collector
+def service_metrics():
+    """
+    Cache hits, queue depths and rejections, read from the components' own stats at scrape time.
+    """
+    tts_stats = tts_cache.stats()
+    admission = {"llm": llm_admission.stats(), "tts": tts_admission.stats()}
+    hits = [
+        ({"cache": "response"}, response_cache.hits),
+        ({"cache": "tts_memory"}, tts_stats["memory_hits"]),
+        ({"cache": "tts_disk"}, tts_stats["disk_hits"]),
+        ({"cache": "tts_coalesced"}, tts_stats["coalesced"]),
+    ]
+    queues = [({"queue": f"{name}_admission"}, stats["queue_depth"]) for name, stats in admission.items()]
+    active = []
+    if llm_engine:
+        scheduler = llm_engine.scheduler.stats()
+        hits.append(({"cache": "llm_prefix"}, scheduler["prefix_cache"]["hits"]))
+        queues.append(({"queue": "llm_scheduler"}, scheduler["pending"]))
+        active.append(({}, scheduler["active"]))
+    if rag_engine:
+        hits.append(({"cache": "embedding"}, rag_engine.query_embedder.stats()["cache_hits"]))
+
+    yield "cache_hits_total", "counter", "Requests served from a cache", hits
+    yield "queue_depth", "gauge", "Requests waiting for admission or for a batch slot", queues
+    yield "in_flight", "gauge", "Requests holding an admission ticket", [
+        ({"engine": name}, stats["in_flight"]) for name, stats in admission.items()
+    ]
+    yield "llm_active_sequences", "gauge", "Sequences in the running decode batch", active
+    yield "admission_rejected_total", "counter", "Requests rejected by admission control", [
+        ({"engine": name, "reason": reason}, stats[f"rejected_{reason}"])
+        for name, stats in admission.items()
+        for reason in ("queue_full", "timeout")
+    ]
 
 if __name__ == "__main__":
-    import os
-    from dotenv import load_dotenv
-    load_dotenv()
-    
     host = os.getenv("HOST", "0.0.0.0")
     port = int(os.getenv("PORT", "8000"))
-    
-    uvicorn.run(app, host=host, port=port)
+    # WEB_WORKERS > 1: fork worker processes that share the preloaded weights
+    workers = int(os.getenv("WEB_WORKERS", "1"))
+
+    from core.prefork import serve
+    serve(app, host, port, workers=workers, preload=preload_models if workers > 1 else None)
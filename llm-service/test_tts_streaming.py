@@ -0,0 +1,142 @@
+import os
+import sys
+import time
+import socket
+import asyncio
+import tempfile
+import threading
+import requests
+import uvicorn
+
+# Add the current directory to sys.path to ensure we can import 'core'
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+# Fresh TTS cache so the first requests really synthesize
+os.environ["TTS_CACHE_DIR"] = tempfile.mkdtemp()
+
+import edge_tts
+import main
+from core.edge_service import EdgeTTSEngine
+
+# Runs /tts against a local stand-in for the edge-tts service, so it needs no
+# network and no model downloads. The stand-in synthesizes one MP3-sized chunk
+# per word with a fixed delay, like the real service streaming a long answer.
+CHUNK_BYTES = 2048
+CHUNK_DELAY = 0.01
+LONG_ANSWER = " ".join(["Dextora builds a personalized study plan for every student."] * 25)
+
+
+class StandInCommunicate:
+    created = 0
+
+    def __init__(self, text, voice):
+        self.words = text.split()
+        StandInCommunicate.created += 1
+
+    async def stream(self):
+        if self.words[0] == "FAIL_EARLY":
+            raise RuntimeError("service unavailable")
+        for i, word in enumerate(self.words):
+            await asyncio.sleep(CHUNK_DELAY)
+            if word == "FAIL_MIDWAY":
+                raise RuntimeError("connection reset")
+            yield {"type": "WordBoundary", "offset": i, "text": word}
+            yield {"type": "audio", "data": bytes([i % 256]) * CHUNK_BYTES}
+
+
+def start_server():
+    edge_tts.Communicate = StandInCommunicate
+    # Only the TTS engine is needed; skip loading the LLM and RAG engines
+    main.app.router.on_startup.clear()
+    main.tts_engine = EdgeTTSEngine()
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}"
+
+
+def time_to_first_byte(base_url, text):
+    start = time.time()
+    first = None
+    size = 0
+    with requests.post(f"{base_url}/tts", json={"message": text}, stream=True) as response:
+        response.raise_for_status()
+        for chunk in response.iter_content(chunk_size=None):
+            if first is None:
+                first = time.time() - start
+            size += len(chunk)
+    return first, time.time() - start, size
+
+
+def main_test():
+    base_url = start_server()
+    words = len(LONG_ANSWER.split())
+    failures = []
+
+    # Old behaviour: the whole utterance had to be synthesized before the first byte
+    start = time.time()
+    buffered = asyncio.run(main.tts_engine.generate_async(LONG_ANSWER))
+    buffered_time = time.time() - start
+
+    ttfb, total, size = time_to_first_byte(base_url, LONG_ANSWER)
+    print(f"{words} words: buffered first byte {buffered_time * 1000:.0f}ms, "
+          f"streamed first byte {ttfb * 1000:.0f}ms (total {total * 1000:.0f}ms)")
+    if size != words * CHUNK_BYTES or size != len(buffered.getvalue()):
+        failures.append(f"expected {words * CHUNK_BYTES} bytes, got {size}")
+    if ttfb > buffered_time / 4:
+        failures.append("first byte was not sent before synthesis finished")
+
+    response = requests.post(f"{base_url}/tts", json={"message": "FAIL_EARLY hello"})
+    print(f"Failure before first chunk: HTTP {response.status_code}")
+    if response.status_code != 500:
+        failures.append("a failure before any audio should return 500")
+
+    try:
+        _, _, size = time_to_first_byte(base_url, "one two three FAIL_MIDWAY four")
+        print(f"Failure mid-stream: stream ended after {size} bytes")
+        if size != 3 * CHUNK_BYTES:
+            failures.append(f"mid-stream failure should end after the chunks already sent, got {size} bytes")
+    except requests.RequestException as e:
+        print(f"Failure mid-stream: client saw {e.__class__.__name__}")
+
+    # Second request for the same text is a cache hit: no synthesis
+    created = StandInCommunicate.created
+    ttfb, _, size = time_to_first_byte(base_url, "  " + LONG_ANSWER.replace(" ", "\n") + " ")
+    print(f"Cache hit (whitespace-normalized text): first byte {ttfb * 1000:.1f}ms, {size} bytes")
+    if StandInCommunicate.created != created or size != words * CHUNK_BYTES:
+        failures.append("repeated text was synthesized again")
+
+    # Concurrent misses for one new text share a single synthesis
+    created = StandInCommunicate.created
+    sizes = []
+    threads = [
+        threading.Thread(target=lambda: sizes.append(time_to_first_byte(base_url, "Welcome to Dextora, how can I help?")[2]))
+        for _ in range(8)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    print(f"8 concurrent misses: {StandInCommunicate.created - created} synthesis, sizes {set(sizes)}")
+    if StandInCommunicate.created - created != 1 or set(sizes) != {7 * CHUNK_BYTES}:
+        failures.append("concurrent misses were not coalesced")
+    print(f"TTS cache: {main.tts_cache.stats()}")
+
+    time.sleep(0.2)
+    in_flight = main.tts_admission.stats()["in_flight"]
+    if in_flight:
+        failures.append(f"{in_flight} TTS admission tickets leaked")
+
+    if failures:
+        print("FAIL: " + "; ".join(failures))
+        sys.exit(1)
+    print("PASS")
+
+
+if __name__ == "__main__":
+    main_test()
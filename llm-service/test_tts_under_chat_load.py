@@ -0,0 +1,75 @@
+import sys
+import time
+import itertools
+import threading
+import requests
+
+BASE_URL = "http://localhost:8000"
+TTS_MESSAGE = "Hello, this is a test of the Dextora Voice System."
+CHAT_QUESTIONS = [
+    "How does Dextora help teachers?",
+    "What exams does Dextora prepare students for?",
+    "How is Dextora different from video lecture platforms?",
+    "What is the mission of Dextora?",
+    "Does Dextora offer 24/7 support?",
+    "How does Dextora personalize study plans?",
+]
+# /tts may get this much slower under /chat load before we call it degraded
+MAX_SLOWDOWN = 1.5
+SAMPLES = 5
+# Every request gets its own text, so each one misses the TTS cache and
+# synthesizes (also across reruns against a server with a warm disk cache)
+RUN_ID = int(time.time())
+_sample_ids = itertools.count()
+
+
+def time_tts():
+    message = f"{TTS_MESSAGE} Sample {RUN_ID} {next(_sample_ids)}."
+    start = time.time()
+    response = requests.post(f"{BASE_URL}/tts", json={"message": message})
+    response.raise_for_status()
+    return time.time() - start
+
+
+def median_tts():
+    timings = sorted(time_tts() for _ in range(SAMPLES))
+    return timings[len(timings) // 2]
+
+
+def run_chat(question):
+    try:
+        with requests.post(f"{BASE_URL}/chat", json={"message": question}, stream=True) as response:
+            for _ in response.iter_content(chunk_size=None):
+                pass
+    except Exception as e:
+        print(f"Chat request failed: {e}")
+
+
+def main():
+    print("Warming up /tts...")
+    time_tts()
+
+    baseline = median_tts()
+    print(f"/tts median latency (idle): {baseline:.3f}s")
+
+    threads = [threading.Thread(target=run_chat, args=(q,)) for q in CHAT_QUESTIONS]
+    for t in threads:
+        t.start()
+
+    # Measure while the chats are embedding/querying and generating
+    loaded = median_tts()
+    print(f"/tts median latency with {len(threads)} concurrent /chat: {loaded:.3f}s")
+
+    for t in threads:
+        t.join()
+
+    ratio = loaded / baseline if baseline else 0.0
+    print(f"Slowdown: {ratio:.2f}x (limit {MAX_SLOWDOWN}x)")
+    if ratio > MAX_SLOWDOWN:
+        print("FAIL: /tts latency degraded under /chat load.")
+        sys.exit(1)
+    print("PASS: /tts latency unaffected by /chat load.")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,15 @@ print(f"Triggering ingestion via {url}...")
 try:
     response = requests.post(url)
     print(f"Status Code: {response.status_code}")
-    print(f"Response: {response.json()}")
+    job = response.json()
+    print(f"Response: {job}")
+
+    # Poll the job until it finishes
+    while job.get("status") in ("queued", "running"):
+        time.sleep(1)
+        job = requests.get(f"{url}/{job['job_id']}").json()
+        print(f"[{job['status']}] files {job['files_done']}/{job['files_total']}, "
+              f"embedded {job['chunks_embedded']} chunks ({job['chunks_per_second']} chunks/s)")
+    print(f"Final: {job}")
 except Exception as e:
     print(f"Error: {e}")